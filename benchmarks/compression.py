@@ -0,0 +1,69 @@
+"""
+Compare 'TransactionState.export_compressed' with 'export_history'.
+
+Reports the size ratio and encode/decode throughput for each codec and level.
+
+Usage:
+    python benchmarks/compression.py [--calls N]
+"""
+
+import argparse
+import time
+
+from transaction import transaction
+from transaction import TransactionState
+
+
+@transaction
+def create_record(record_id: int, tenant: str, payload: dict[str, str]) -> int:
+    return record_id
+
+
+@create_record.rollback
+def delete_record(record_id: int, tenant: str, payload: dict[str, str]) -> None:
+    pass
+
+
+def build_state(calls: int) -> TransactionState:
+    with TransactionState() as state:
+        for i in range(calls):
+            create_record(i, f"tenant-{i % 20}", {"status": "new", "source": "benchmark"})
+    return state
+
+
+def measure(label: str, size: int, baseline: int, calls: int, encode: float, decode: float) -> None:
+    print(
+        f"{label:<12} {size:>12,} bytes  ratio {baseline / size:>7.1f}x  "
+        f"encode {calls / encode:>10,.0f} calls/s  decode {calls / decode:>10,.0f} calls/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    state = build_state(args.calls)
+
+    start = time.perf_counter()
+    exported = state.export_history()
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    TransactionState.import_history(exported)
+    decode = time.perf_counter() - start
+    baseline = len(exported.encode())
+    measure("json", baseline, baseline, args.calls, encode, decode)
+
+    for codec, levels in (("zlib", (1, 6, 9)), ("lzma", (0, 6))):
+        for level in levels:
+            start = time.perf_counter()
+            data = state.export_compressed(codec=codec, level=level)
+            encode = time.perf_counter() - start
+            start = time.perf_counter()
+            TransactionState.import_compressed(data)
+            decode = time.perf_counter() - start
+            measure(f"{codec}-{level}", len(data), baseline, args.calls, encode, decode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measure the import time cost of '@transaction', and the cost of classifying rollback functions.
+
+Decorates a module of generated functions, then rolls back a state with calls to one of them.
+
+Usage:
+    python benchmarks/decoration.py [--functions N] [--calls N]
+"""
+
+import argparse
+import time
+
+from transaction import transaction
+from transaction import TransactionState
+
+
+def generate(functions: int) -> list[object]:
+    source = "\n".join(f"def step_{i}(value):\n    return value\n" for i in range(functions))
+    namespace: dict[str, object] = {}
+    exec(source, namespace)  # noqa: S102
+    return [namespace[f"step_{i}"] for i in range(functions)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=20_000)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    functions = generate(args.functions)
+    start = time.perf_counter()
+    wrappers = [transaction(func) for func in functions]  # type: ignore[call-overload]
+    elapsed = time.perf_counter() - start
+    print(f"decorate  {elapsed / args.functions * 1e6:>8.2f} us per function")
+
+    step = wrappers[0]
+
+    @step.rollback
+    def undo_step(value: object) -> None:
+        pass
+
+    with TransactionState() as state:
+        for i in range(args.calls):
+            step(i)
+    start = time.perf_counter()
+    state.rollback()
+    elapsed = time.perf_counter() - start
+    print(f"rollback  {elapsed / args.calls * 1e6:>8.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
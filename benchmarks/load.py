@@ -0,0 +1,193 @@
+"""
+Load test concurrent transactions with injected failures and slow rollbacks.
+
+Usage:
+    python benchmarks/load.py [--transactions N] [--threads N] [--steps N] [--failure-rate F]
+                              [--slow-rollback-rate F] [--rollback-latency S] [--seed N]
+
+Runs '--transactions' TransactionStates concurrently on one event loop, then the same number of transactions on
+'--threads' threads.  Every transaction records '--steps' synthetic sync and async steps.  A '--failure-rate'
+fraction of the transactions raises an exception at a random step and is rolled back, and a '--slow-rollback-rate'
+fraction of the rollback functions sleeps for '--rollback-latency' seconds.  Sync rollback functions sleep with
+'time.sleep', so in the asyncio run they block the event loop, like any blocking rollback would.
+
+Reports throughput, p50/p99 latency of recording a step and of rolling back a transaction, and peak RSS.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+
+from transaction import transaction
+from transaction import TransactionState
+
+SETTINGS = {"slow_rollback_rate": 0.1, "rollback_latency": 0.01}
+
+
+class InjectedFailure(Exception):
+    pass
+
+
+@dataclass
+class Results:
+    transactions: int = 0
+    failures: int = 0
+    calls_rolled_back: int = 0
+    rollback_errors: int = 0
+    record_latencies: list[float] = field(default_factory=list)
+    rollback_latencies: list[float] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@transaction
+def sync_step(transaction_id: int, step: int) -> int:
+    return step
+
+
+@sync_step.rollback
+def undo_sync_step(transaction_id: int, step: int) -> None:
+    if random.random() < SETTINGS["slow_rollback_rate"]:
+        time.sleep(SETTINGS["rollback_latency"])
+
+
+@transaction
+async def async_step(transaction_id: int, step: int) -> int:
+    await asyncio.sleep(0)
+    return step
+
+
+@async_step.rollback
+async def undo_async_step(transaction_id: int, step: int) -> None:
+    if random.random() < SETTINGS["slow_rollback_rate"]:
+        await asyncio.sleep(SETTINGS["rollback_latency"])
+
+
+def failing_step(rng: random.Random, steps: int, failure_rate: float) -> int | None:
+    return rng.randrange(steps) if rng.random() < failure_rate else None
+
+
+def collect(results: Results, state: TransactionState, failed: bool) -> None:
+    with results.lock:
+        results.transactions += 1
+        if not failed:
+            return
+        results.failures += 1
+        results.calls_rolled_back += state.stats.rolled_back
+        results.rollback_errors += state.stats.rollback_failed
+        results.rollback_latencies.append(state.stats.rollback_duration)
+
+
+async def run_async_transaction(transaction_id: int, steps: int, fail_at: int | None, results: Results) -> None:
+    state = TransactionState(reraise=False)
+    async with state:
+        for step in range(steps):
+            if step == fail_at:
+                raise InjectedFailure(transaction_id)
+            if step % 2:
+                await async_step(transaction_id, step)
+            else:
+                start = time.perf_counter()
+                sync_step(transaction_id, step)
+                results.record_latencies.append(time.perf_counter() - start)
+    collect(results, state, fail_at is not None)
+
+
+def run_thread_transaction(transaction_id: int, steps: int, fail_at: int | None, results: Results) -> None:
+    state = TransactionState(reraise=False)
+    with state:
+        for step in range(steps):
+            if step == fail_at:
+                raise InjectedFailure(transaction_id)
+            start = time.perf_counter()
+            sync_step(transaction_id, step)
+            results.record_latencies.append(time.perf_counter() - start)
+    collect(results, state, fail_at is not None)
+
+
+async def run_async(transactions: int, steps: int, failure_rate: float, rng: random.Random) -> Results:
+    results = Results()
+    await asyncio.gather(
+        *(
+            run_async_transaction(transaction_id, steps, failing_step(rng, steps, failure_rate), results)
+            for transaction_id in range(transactions)
+        )
+    )
+    return results
+
+
+def run_threads(transactions: int, threads: int, steps: int, failure_rate: float, rng: random.Random) -> Results:
+    results = Results()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(
+                run_thread_transaction, transaction_id, steps, failing_step(rng, steps, failure_rate), results
+            )
+            for transaction_id in range(transactions)
+        ]
+        for future in futures:
+            future.result()
+    return results
+
+
+def percentiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    cut = statistics.quantiles(values, n=100)
+    return f"p50 {cut[49] * 1e6:,.1f}us, p99 {cut[98] * 1e6:,.1f}us"
+
+
+def peak_rss() -> str:
+    try:
+        import resource
+    except ImportError:
+        return "n/a"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return f"{peak / 1024 if sys.platform == 'darwin' else peak:,.0f} KB"
+
+
+def report(name: str, results: Results, elapsed: float) -> None:
+    print(f"{name}: {results.transactions:,} transactions in {elapsed:.2f}s ({results.transactions / elapsed:,.0f}/s)")
+    print(
+        f"  failures: {results.failures:,}, calls rolled back: {results.calls_rolled_back:,}, "
+        f"rollback errors: {results.rollback_errors:,}"
+    )
+    print(f"  record latency: {percentiles(results.record_latencies)}")
+    print(f"  rollback latency: {percentiles(results.rollback_latencies)}")
+    print(f"  peak RSS: {peak_rss()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=1_000)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rollback-rate", type=float, default=SETTINGS["slow_rollback_rate"])
+    parser.add_argument("--rollback-latency", type=float, default=SETTINGS["rollback_latency"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    SETTINGS["slow_rollback_rate"] = args.slow_rollback_rate
+    SETTINGS["rollback_latency"] = args.rollback_latency
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_async(args.transactions, args.steps, args.failure_rate, rng))
+    report("asyncio", results, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = run_threads(args.transactions, args.threads, args.steps, args.failure_rate, rng)
+    report(f"{args.threads:,} threads", results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure 'recover_histories' throughput on synthetic exported histories.
+
+Usage:
+    python benchmarks/recovery.py [--histories N] [--calls N] [--latency S] [--processes N] [--concurrency N]
+
+Rollback functions sleep for '--latency' seconds to simulate a call to an external service.  Compare the CPU time
+of the event loop process with '--processes 0', which decodes in that process.
+"""
+
+import argparse
+import asyncio
+import time
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.recovery import recover_histories
+
+SETTINGS = {"latency": 0.001}
+
+
+@transaction
+def reserve(order_id: int, sku: str) -> int:
+    return order_id
+
+
+@reserve.rollback
+async def release(order_id: int, sku: str) -> None:
+    await asyncio.sleep(SETTINGS["latency"])
+
+
+def build_histories(histories: int, calls: int) -> list[str]:
+    exported = []
+    for order_id in range(histories):
+        with TransactionState() as state:
+            for i in range(calls):
+                reserve(order_id, f"sku-{i}")
+        exported.append(state.export_history())
+    return exported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--histories", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=SETTINGS["latency"])
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=500)
+    args = parser.parse_args()
+
+    SETTINGS["latency"] = args.latency
+    histories = build_histories(args.histories, args.calls)
+
+    sample = histories[:100]
+    start = time.perf_counter()
+    for history in sample:
+        TransactionState.import_history(history).rollback()
+    sequential = len(sample) / (time.perf_counter() - start)
+    print(f"sequential import_history + rollback: {sequential:,.0f} histories/s")
+
+    cpu = time.process_time()
+    report = recover_histories(histories, processes=args.processes, concurrency=args.concurrency)
+    cpu = time.process_time() - cpu
+    print(f"recover_histories: {report}")
+    # Decoding processes run on other CPUs, the event loop process bounds throughput on a multi-core host
+    print(f"event loop process CPU: {cpu:.2f}s ({args.histories / cpu:,.0f} histories/s)")
+    print(f"calls rolled back: {sum(outcome.rolled_back for outcome in report.outcomes):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -109,3 +109,36 @@ def format(session: Session) -> None:
     """
     ruff(session)
     black(session)
+
+
+@nox.session(python=PYTHON_VERSIONS["latest"], default=False)
+def benchmarks(session: Session) -> None:
+    """
+    Initialize environment and run the benchmark scripts
+
+    Args:
+        session: nox.session.Session
+
+    Returns:
+        None
+    """
+    session.install(".")
+    session.run("python", "benchmarks/compression.py")
+    session.run("python", "benchmarks/decoration.py")
+    session.run("python", "benchmarks/recovery.py")
+
+
+@nox.session(python=PYTHON_VERSIONS["latest"], default=False)
+def load(session: Session) -> None:
+    """
+    Initialize environment and run the load test, passing session arguments to it,
+    e.g. 'nox -s load -- --transactions 50000 --failure-rate 0.1'
+
+    Args:
+        session: nox.session.Session
+
+    Returns:
+        None
+    """
+    session.install(".")
+    session.run("python", "benchmarks/load.py", *session.posargs)
@@ -0,0 +1,173 @@
+import gc
+import json
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import transaction
+from transaction import TransactionState
+
+events: list[tuple[str, object]] = []
+
+
+class Account:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.balance = 0
+
+    @transaction
+    def deposit(self, amount: int) -> int:
+        self.balance += amount
+        return self.balance
+
+    @deposit.rollback
+    def undo_deposit(self, amount: int) -> None:
+        self.balance -= amount
+        events.append(("undo_deposit", self.name))
+
+    @transaction
+    async def adeposit(self, amount: int) -> int:
+        return self.deposit(amount)
+
+    @adeposit.rollback
+    async def undo_adeposit(self, amount: int) -> None:
+        events.append(("undo_adeposit", self.name))
+
+
+class Ledger:
+    registry: dict[str, "Ledger"] = {}
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.entries: list[int] = []
+        Ledger.registry[key] = self
+
+    @transaction(instance_key=lambda self: self.key)
+    def add(self, entry: int) -> None:
+        self.entries.append(entry)
+
+    @add.rollback
+    @staticmethod
+    def undo_add(key: str, entry: int) -> None:
+        Ledger.registry[key].entries.remove(entry)
+        events.append(("undo_add", key))
+
+
+class Slotted:
+    __slots__ = ()
+
+    @transaction
+    def touch(self) -> None:
+        pass
+
+
+def test_instance_method_binds_self() -> None:
+    events.clear()
+    account = Account("a")
+    with pytest.raises(ValueError):
+        with TransactionState() as state:
+            assert account.deposit(5) == 5
+            assert account.deposit(7) == 12
+            raise ValueError("abort")
+
+    assert account.balance == 0
+    assert events == [("undo_deposit", "a"), ("undo_deposit", "a")]
+    assert state.stack[0].args == (5,)
+    assert state.stack[0].instance_ref() is account
+
+
+def test_instance_method_holds_weak_reference() -> None:
+    with TransactionState() as state:
+        account = Account("b")
+        account.deposit(1)
+        del account
+        gc.collect()
+
+    assert state.stack[0].instance_ref() is None
+    with pytest.raises(RuntimeError, match="no longer exists"):
+        state.rollback()
+
+
+@pytest.mark.asyncio
+async def test_async_instance_method() -> None:
+    events.clear()
+    account = Account("c")
+    with pytest.raises(ValueError):
+        async with TransactionState():
+            assert await account.adeposit(3) == 3
+            raise ValueError("abort")
+
+    assert events == [("undo_deposit", "c"), ("undo_adeposit", "c")]
+    assert account.balance == 0
+
+
+def test_instance_key_is_exported() -> None:
+    events.clear()
+    ledger = Ledger("ledger-1")
+    with TransactionState() as state:
+        ledger.add(10)
+        exported = state.export_history()
+
+    assert json.loads(exported)[0]["instance_key"] == "ledger-1"
+    assert state.stack[0].instance_ref is None
+
+    TransactionState.import_history(exported).rollback()
+    assert ledger.entries == []
+    assert events == [("undo_add", "ledger-1")]
+
+
+def test_bound_call_pickle_drops_reference() -> None:
+    account = Account("d")
+    with TransactionState() as state:
+        account.deposit(1)
+
+    unpickled = FunctionCall.from_pickle(state.stack[0].to_pickle())
+    assert unpickled.instance_ref() is None
+
+
+def test_bound_call_export_drops_reference() -> None:
+    account = Account("f")
+    with TransactionState() as state:
+        account.deposit(1)
+        exported = state.export_history()
+
+    assert json.loads(exported)[0]["bound"] is True
+    imported = TransactionState.import_history(exported)
+    with pytest.raises(RuntimeError, match="no longer exists"):
+        imported.rollback()
+    assert account.balance == 1
+
+
+def test_unweakrefable_instance_requires_key() -> None:
+    with TransactionState():
+        with pytest.raises(TypeError, match="instance_key"):
+            Slotted().touch()
+
+
+def test_class_access_returns_wrapper() -> None:
+    assert Account.deposit.rollback_func is Account.undo_deposit
+    assert Account("e").deposit.__self__.name == "e"
+
+
+class Registry:
+    @classmethod
+    @transaction
+    def register(cls, name: str) -> str:
+        return name
+
+
+@Registry.register.rollback
+def unregister(cls: type[Registry], name: str) -> None:
+    events.append(("unregister", cls))
+
+
+def test_classmethod_calls_are_not_bound() -> None:
+    events.clear()
+    with TransactionState(reraise=False) as state:
+        assert Registry.register("a") == "a"
+        raise ValueError("roll back")
+    call = state.stack[0]
+    assert call.args == (Registry, "a")
+    assert call.instance_ref is None
+    assert "bound" not in call.to_dict()
+    assert events == [("unregister", Registry)]
@@ -44,7 +44,7 @@ async def test_example_3() -> None:
             return j
 
         @transaction
-        def instancemethod_call(self, k: list | None = None) -> list | None:  # not supported
+        def instancemethod_call(self, k: list | None = None) -> list | None:
             return k
 
     @MyClass.staticmethod_call.rollback
@@ -75,7 +75,7 @@ async def test_example_3() -> None:
     ]
 
     mc = MyClass()
-    assert mc.instancemethod_call([1, 2, 3]) is None
+    assert mc.instancemethod_call([1, 2, 3]) == [1, 2, 3]
 
     with pytest.raises(ValueError):
         transaction(lambda x: x + 1)
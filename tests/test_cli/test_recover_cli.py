@@ -0,0 +1,153 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction import cli
+from transaction.cli import main
+
+undone: list[int] = []
+failing = {2}
+interrupting: set[int] = set()
+
+
+class Killed(BaseException):
+    pass
+
+
+@transaction
+def step(history: int) -> int:
+    return history
+
+
+@step.rollback
+def undo_step(history: int) -> None:
+    if history in interrupting:
+        raise Killed
+    if history in failing:
+        raise ValueError("undo failed")
+    undone.append(history)
+
+
+def export(history: int, compressed: bool = False) -> str | bytes:
+    with TransactionState() as state:
+        step(history)
+    return state.export_compressed() if compressed else state.export_history()
+
+
+@pytest.fixture
+def directory(tmp_path: Path) -> Path:
+    histories = tmp_path / "histories"
+    histories.mkdir()
+    for i in range(4):
+        (histories / f"{i}.json").write_text(export(i))  # type: ignore[arg-type]
+    (histories / "4.txnz").write_bytes(export(4, compressed=True))  # type: ignore[arg-type]
+    return histories
+
+
+def test_recover_directory(directory: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    undone.clear()
+    assert main([str(directory), "--processes", "0", "--batch-size", "2"]) == 1
+
+    assert sorted(undone) == [0, 1, 3, 4]
+    out, err = capsys.readouterr()
+    assert "Recovered 5 histories" in out
+    assert "4 succeeded, 1 failed, 0 skipped, 4 calls rolled back" in out
+    assert "2.json: ValueError: undo failed" in err
+
+    checkpoint = [json.loads(line) for line in Path(f"{directory}.checkpoint").read_text().splitlines()]
+    assert [entry["id"] for entry in checkpoint] == ["0.json", "1.json", "2.json", "3.json", "4.txnz"]
+
+
+def test_recover_directory_resumes(directory: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    checkpoint = directory.parent / "progress"
+    checkpoint.write_text(json.dumps({"id": "0.json", "success": True, "error": None}) + "\n" + '{"id": "1.j')
+    undone.clear()
+    main([str(directory), "--processes", "0", "--checkpoint", str(checkpoint)])
+    assert sorted(undone) == [1, 3, 4]
+
+    undone.clear()
+    assert main([str(directory), "--processes", "0", "--checkpoint", str(checkpoint)]) == 0
+    assert undone == []
+    assert "0 succeeded, 0 failed, 5 skipped" in capsys.readouterr().out
+
+    assert main([str(directory), "--processes", "0", "--checkpoint", str(checkpoint), "--retry-failed"]) == 1
+    assert "0 succeeded, 1 failed, 4 skipped" in capsys.readouterr().out
+
+
+def test_interrupted_batch_resumes_after_handled_histories(directory: Path) -> None:
+    undone.clear()
+    interrupting.add(3)
+    try:
+        with pytest.raises(Killed):
+            main([str(directory), "--processes", "0"])
+    finally:
+        interrupting.clear()
+    assert undone == [0, 1, 4]
+    # Every handled history of the batch is checkpointed, not only complete batches
+    checkpoint = [json.loads(line) for line in Path(f"{directory}.checkpoint").read_text().splitlines()]
+    assert [entry["id"] for entry in checkpoint] == ["0.json", "1.json", "2.json", "4.txnz"]
+
+    undone.clear()
+    assert main([str(directory), "--processes", "0"]) == 0
+    assert undone == [3]
+
+
+def test_retry_failed_skips_rolled_back_calls(tmp_path: Path) -> None:
+    histories = tmp_path / "histories"
+    histories.mkdir()
+    with TransactionState() as state:
+        for history in (20, 2, 21):
+            step(history)
+    (histories / "partial.json").write_text(state.export_history())
+    (histories / "partial.txnz").write_bytes(state.export_compressed())
+
+    undone.clear()
+    assert main([str(histories), "--processes", "0"]) == 1
+    assert undone == [21, 21]
+    checkpoint = [json.loads(line) for line in Path(f"{histories}.checkpoint").read_text().splitlines()]
+    assert [entry["rolled_back"] for entry in checkpoint] == [[2], [2]]
+
+    undone.clear()
+    failing.clear()
+    try:
+        assert main([str(histories), "--processes", "0", "--retry-failed"]) == 0
+    finally:
+        failing.add(2)
+    assert undone == [2, 20, 2, 20]
+
+
+def test_one_process_pool_per_run(directory: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pools: list[int | None] = []
+
+    class CountingPool(cli.ProcessPoolExecutor):
+        def __init__(self, max_workers: int | None = None) -> None:
+            pools.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", CountingPool)
+    main([str(directory), "--processes", "1", "--batch-size", "2"])
+    assert pools == [1]
+
+
+def test_recover_sqlite(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    database = tmp_path / "histories.db"
+    connection = sqlite3.connect(database)
+    connection.execute("CREATE TABLE pending (id TEXT PRIMARY KEY, history BLOB)")
+    connection.executemany(
+        "INSERT INTO pending VALUES (?, ?)",
+        [("a", export(10)), ("b", export(11, compressed=True))],
+    )
+    connection.commit()
+    connection.close()
+
+    undone.clear()
+    assert main([str(database), "--sqlite", "--table", "pending", "--processes", "0", "--concurrency", "1"]) == 0
+    assert sorted(undone) == [10, 11]
+    assert "2 succeeded" in capsys.readouterr().out
+
+    with pytest.raises(ValueError, match="Invalid table name"):
+        main([str(database), "--sqlite", "--table", "x; DROP TABLE pending", "--processes", "0"])
@@ -0,0 +1,96 @@
+import pytest
+
+from transaction import PartialBatchError
+from transaction import transaction
+from transaction import TransactionState
+
+undone: list[list[int]] = []
+
+
+@transaction(batch=True)
+def insert(rows: list[int], table: str) -> int:
+    for index, row in enumerate(rows):
+        if row < 0:
+            raise PartialBatchError(index)
+    return len(rows)
+
+
+@insert.rollback
+def undo_insert(rows: list[int], table: str) -> None:
+    undone.append(list(rows))
+
+
+@transaction(batch=True)
+async def async_insert(rows: list[int]) -> int:
+    if -1 in rows:
+        raise PartialBatchError(rows.index(-1), "bad row")
+    return len(rows)
+
+
+@async_insert.rollback
+async def undo_async_insert(rows: list[int]) -> None:
+    undone.append(list(rows))
+
+
+class Table:
+    @transaction(batch=True)
+    def insert(self, rows: list[int]) -> None:
+        raise PartialBatchError(1)
+
+    @insert.rollback
+    def undo_insert(self, rows: list[int]) -> None:
+        undone.append(list(rows))
+
+
+def test_batch_is_recorded_as_one_call() -> None:
+    undone.clear()
+    state = TransactionState()
+    with pytest.raises(RuntimeError):
+        with state:
+            assert insert(list(range(1000)), "t") == 1000
+            assert insert([1, 2], table="t") == 2
+            raise RuntimeError("fail")
+    assert len(state.stack) == 2
+    assert undone == [[1, 2], list(range(1000))]
+
+
+def test_partial_failure_rolls_back_processed_items() -> None:
+    undone.clear()
+    state = TransactionState()
+    with pytest.raises(PartialBatchError, match="Batch failed after 2 items"):
+        with state:
+            insert([1, 2], "t")
+            insert([3, 4, -1, 5], "t")
+    assert state.stack[1].args == ([3, 4], "t")
+    assert undone == [[3, 4], [1, 2]]
+
+
+async def test_async_partial_failure() -> None:
+    undone.clear()
+    with pytest.raises(PartialBatchError, match="bad row"):
+        async with TransactionState():
+            await async_insert([1])
+            await async_insert([2, -1])
+    assert undone == [[2], [1]]
+
+
+def test_instance_method_batch() -> None:
+    undone.clear()
+    table = Table()
+    with pytest.raises(PartialBatchError):
+        with TransactionState():
+            table.insert([7, 8, 9])
+    assert undone == [[7]]
+
+
+def test_batch_requires_items() -> None:
+    with pytest.raises(TypeError, match="takes a sequence of items"):
+        insert()  # type: ignore[call-arg]
+    with pytest.raises(ValueError, match="items_per_call"):
+
+        @transaction(batch=True)
+        def gen(rows: list[int]):  # type: ignore[no-untyped-def]
+            yield from rows
+
+    with pytest.raises(ValueError, match="must not be negative"):
+        PartialBatchError(-1)
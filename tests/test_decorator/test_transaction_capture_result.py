@@ -0,0 +1,99 @@
+import json
+from typing import Any
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+deleted: list[Any] = []
+
+
+@transaction(capture_result=True)
+def create(name: str) -> int:
+    if name == "bad":
+        raise ValueError("create failed")
+    return len(name)
+
+
+@create.rollback
+def delete(name: str, result: int | None = None) -> None:
+    deleted.append((name, result))
+
+
+@transaction(capture_result=lambda row: row["id"])
+async def insert(name: str) -> dict[str, Any]:
+    return {"id": f"row-{name}", "name": name}
+
+
+@insert.rollback
+async def undo_insert(name: str, result: str) -> None:
+    deleted.append(result)
+
+
+@transaction(capture_result=lambda result: result[0])
+def export_during_call(name: str) -> tuple[str, str]:
+    state = TransactionState.get_current()
+    assert state
+    return name.upper(), state.export_delta()
+
+
+def test_rollback_receives_captured_result() -> None:
+    deleted.clear()
+    state = TransactionState()
+    with pytest.raises(ValueError, match="create failed"):
+        with state:
+            assert create("abc") == 3
+            create("bad")
+    assert deleted == [("bad", None), ("abc", 3)]
+    assert state.stack[0].result == 3
+    assert not state.stack[1].result_captured
+
+
+async def test_extracted_result_of_coroutine() -> None:
+    deleted.clear()
+    with pytest.raises(RuntimeError):
+        async with TransactionState() as state:
+            assert await insert("a") == {"id": "row-a", "name": "a"}
+            raise RuntimeError("fail")
+    assert state.stack[0].result == "row-a"
+    assert deleted == ["row-a"]
+
+
+def test_result_is_exported_and_imported() -> None:
+    with TransactionState() as state:
+        create("abcd")
+        delta = json.loads(state.export_delta())
+        create("ab")
+
+    history = json.loads(state.export_history())
+    assert history[0]["result"] == 4
+    assert "result" in delta["records"][0]
+
+    deleted.clear()
+    TransactionState.import_history(state.export_history()).rollback()
+    TransactionState.import_compressed(state.export_compressed()).rollback()
+    assert deleted == [("ab", 2), ("abcd", 4)] * 2
+
+
+def test_result_is_part_of_delta_updates() -> None:
+    mirror = TransactionState()
+    with TransactionState() as state:
+        deltas = [export_during_call("x")[1]]
+        deltas.append(state.export_delta())
+
+    first, second = (json.loads(delta) for delta in deltas)
+    assert "result" not in first["records"][0]
+    assert second["updates"][0]["result"] == "X"
+    for delta in deltas:
+        mirror.apply_delta(delta)
+    assert mirror.stack[0].result == "X"
+    assert mirror.stack[0].result_captured
+
+
+def test_capture_result_not_supported_for_generators() -> None:
+    with pytest.raises(ValueError, match="capture_result"):
+
+        @transaction(capture_result=True)
+        def gen() -> Any:
+            yield 1
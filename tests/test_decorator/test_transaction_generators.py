@@ -0,0 +1,89 @@
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+undone: list[tuple[list[int], str]] = []
+
+
+@transaction
+def ingest(source: str, count: int):  # type: ignore[no-untyped-def]
+    for i in range(count):
+        yield i
+
+
+@ingest.rollback
+def undo_ingest(items: list[int], source: str, count: int) -> None:
+    undone.append((list(items), source))
+
+
+@transaction(items_per_call=3)
+def ingest_batches(source: str, count: int):  # type: ignore[no-untyped-def]
+    yield from range(count)
+
+
+@ingest_batches.rollback
+def undo_ingest_batches(items: list[int], source: str, count: int) -> None:
+    undone.append((list(items), source))
+
+
+@transaction(items_per_call=2)
+async def aingest(source: str, count: int):  # type: ignore[no-untyped-def]
+    for i in range(count):
+        yield i
+
+
+@aingest.rollback
+async def undo_aingest(items: list[int], source: str, count: int) -> None:
+    undone.append((list(items), source))
+
+
+def test_generator_records_each_item() -> None:
+    undone.clear()
+    with pytest.raises(ValueError):
+        with TransactionState() as state:
+            for item in ingest("a", 10):
+                if item == 2:
+                    raise ValueError("consumer failed")
+
+    assert [call.args for call in state.stack] == [([0], "a", 10), ([1], "a", 10), ([2], "a", 10)]
+    assert undone == [([2], "a"), ([1], "a"), ([0], "a")]
+
+
+def test_generator_records_batches_lazily() -> None:
+    undone.clear()
+    with pytest.raises(ValueError):
+        with TransactionState() as state:
+            gen = ingest_batches("b", 100)
+            assert state.stack == []
+            for item in gen:
+                if item == 7:
+                    raise ValueError("consumer failed")
+
+    assert len(state.stack) == 3
+    assert undone == [([6, 7], "b"), ([3, 4, 5], "b"), ([0, 1, 2], "b")]
+
+
+@pytest.mark.asyncio
+async def test_async_generator_records_batches() -> None:
+    undone.clear()
+    with pytest.raises(ValueError):
+        async with TransactionState() as state:
+            async for item in aingest("c", 10):
+                if item == 4:
+                    raise ValueError("consumer failed")
+
+    assert [call.args[0] for call in state.stack] == [[0, 1], [2, 3], [4]]
+    assert undone == [([4], "c"), ([2, 3], "c"), ([0, 1], "c")]
+
+
+def test_generator_without_state() -> None:
+    assert list(ingest_batches("d", 4)) == [0, 1, 2, 3]
+
+
+def test_items_per_call_must_be_positive() -> None:
+    with pytest.raises(ValueError, match="items_per_call"):
+
+        @transaction(items_per_call=0)
+        def bad():  # type: ignore[no-untyped-def]
+            yield 1
@@ -0,0 +1,134 @@
+import json
+import os
+import signal
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.flight_recorder import FlightRecorder
+
+
+@transaction
+def step(value: object) -> object:
+    return value
+
+
+@step.rollback
+def undo_step(value: object) -> None:
+    pass
+
+
+@pytest.fixture
+def recorder() -> Iterator[FlightRecorder]:
+    yield FlightRecorder.install(size=3, max_calls=2, preview_length=20)
+    FlightRecorder.uninstall()
+
+
+def test_disabled_by_default() -> None:
+    assert TransactionState.flight_recorder is None
+
+
+def test_summaries(recorder: FlightRecorder) -> None:
+    with TransactionState():
+        step(1)
+        step("x" * 100)
+        step(3)
+    with TransactionState(reraise=False):
+        step(4)
+        raise ValueError("boom")
+
+    committed, rolled_back = recorder.summaries()
+    assert committed.outcome == "committed"
+    assert committed.calls == 3
+    assert committed.error is None
+    assert [call[0] for call in committed.recent_calls] == [step.__qualname__] * 2
+    assert all(len(call[1]) <= 20 for call in committed.recent_calls)
+    assert committed.recent_calls[1][1] == "(3,), {}"
+
+    assert rolled_back.outcome == "rolled_back"
+    assert rolled_back.rolled_back == 1
+    assert rolled_back.error == "ValueError('boom')"
+    assert rolled_back.recent_calls == [(step.__qualname__, "(4,), {}", True, None)]
+
+
+@transaction
+def vetoed(value: object) -> object:
+    return value
+
+
+@vetoed.rollback
+def undo_vetoed(value: object) -> None:
+    pass
+
+
+@vetoed.prepare
+def prepare_vetoed(calls: list[object]) -> bool:
+    return False
+
+
+@transaction
+def published(value: object) -> object:
+    return value
+
+
+@published.commit
+def commit_published(calls: list[object]) -> None:
+    raise OSError("broker down")
+
+
+def test_failed_commit_outcomes(recorder: FlightRecorder) -> None:
+    with pytest.raises(RuntimeError, match="Commit vetoed"):
+        with TransactionState():
+            vetoed(1)
+    with pytest.raises(OSError):
+        with TransactionState():
+            published(2)
+
+    vetoed_summary, failed_summary = recorder.summaries()
+    assert vetoed_summary.outcome == "rolled_back"
+    assert vetoed_summary.rolled_back == 1
+    assert vetoed_summary.error is not None and vetoed_summary.error.startswith("Runtime")
+    assert failed_summary.outcome == "commit_failed"
+    assert failed_summary.rolled_back == 0
+    assert failed_summary.error is not None and failed_summary.error.startswith("OSError")
+
+
+async def test_failed_commit_outcome_async(recorder: FlightRecorder) -> None:
+    with pytest.raises(RuntimeError, match="Commit vetoed"):
+        async with TransactionState():
+            vetoed(1)
+    assert recorder.summaries()[0].outcome == "rolled_back"
+
+
+def test_ring_buffer_keeps_last(recorder: FlightRecorder) -> None:
+    for i in range(5):
+        with TransactionState():
+            step(i)
+    summaries = recorder.summaries()
+    assert len(recorder._slots) == 3
+    assert [summary.recent_calls[0][1] for summary in summaries] == ["(2,), {}", "(3,), {}", "(4,), {}"]
+
+
+def test_dump(recorder: FlightRecorder, tmp_path: Path) -> None:
+    with TransactionState():
+        step(1)
+    data = json.loads(recorder.dump())
+    assert data[0]["outcome"] == "committed"
+    assert data[0]["recent_calls"] == [[step.__qualname__, "(1,), {}", False, None]]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="SIGUSR1 is not available")
+def test_dump_on_signal(recorder: FlightRecorder, tmp_path: Path) -> None:
+    path = tmp_path / "flight.json"
+    previous = signal.getsignal(signal.SIGUSR1)
+    recorder.dump_on_signal(path=str(path))
+    try:
+        with TransactionState():
+            step(1)
+        os.kill(os.getpid(), signal.SIGUSR1)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+    assert json.loads(path.read_text())[0]["calls"] == 1
@@ -0,0 +1,82 @@
+import functools
+import gc
+
+import pytest
+
+from transaction import helpers
+from transaction import transaction
+from transaction import TransactionState
+from transaction.helpers import clear_function_type_cache
+from transaction.helpers import FunctionType
+from transaction.helpers import inspect_function
+
+
+@pytest.fixture
+def classify_count(monkeypatch: pytest.MonkeyPatch) -> list[object]:
+    clear_function_type_cache()
+    calls: list[object] = []
+    original = helpers.get_function_type
+
+    def counting(ctx: object, func: object) -> FunctionType:
+        calls.append(func)
+        return original(ctx, func)
+
+    monkeypatch.setattr(helpers, "get_function_type", counting)
+    return calls
+
+
+def test_inspect_function_is_cached(classify_count: list[object]) -> None:
+    def sample() -> None:
+        pass
+
+    assert inspect_function(sample) is FunctionType.REGULAR_FUNCTION
+    assert inspect_function(sample) is FunctionType.REGULAR_FUNCTION
+    assert classify_count == [sample]
+
+
+def test_cache_does_not_keep_functions_alive(classify_count: list[object]) -> None:
+    def sample() -> None:
+        pass
+
+    inspect_function(sample)
+    classify_count.clear()
+    assert len(helpers._function_types) == 1
+    del sample
+    gc.collect()
+    assert len(helpers._function_types) == 0
+
+
+def test_uncacheable_callables_are_classified(classify_count: list[object]) -> None:
+    class Unhashable:
+        __hash__ = None  # type: ignore[assignment]
+
+        def __call__(self) -> None:
+            pass
+
+    func = Unhashable()
+    assert inspect_function(func) is FunctionType.UNKNOWN
+    assert inspect_function(func) is FunctionType.UNKNOWN
+    assert classify_count == [func, func]
+
+    partial = functools.partial(print, 1)
+    assert inspect_function(partial) is FunctionType.PARTIAL_FUNCTION
+    assert inspect_function(partial) is FunctionType.PARTIAL_FUNCTION
+    assert classify_count == [func, func, partial]
+
+
+def test_rollback_does_not_reclassify(classify_count: list[object]) -> None:
+    @transaction
+    def step(i: int) -> int:
+        return i
+
+    @step.rollback
+    def undo(i: int) -> None:
+        pass
+
+    with TransactionState() as state:
+        for i in range(10):
+            step(i)
+    state.rollback()
+    state.rollback()
+
+    assert classify_count == [step.func, undo]
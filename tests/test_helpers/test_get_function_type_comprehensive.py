@@ -31,6 +31,11 @@ def test_get_function_type_variants() -> None:
 
     assert get_function_type(None, gen) is FunctionType.GENERATOR_FUNCTION
 
+    async def agen() -> int:
+        yield 1
+
+    assert get_function_type(None, agen) is FunctionType.ASYNC_GENERATOR_FUNCTION
+
     class Demo:
         def inst(self) -> None:
             pass
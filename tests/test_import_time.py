@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+# Generous budget for the cumulative import time of the package, in microseconds
+IMPORT_TIME_BUDGET_US = 100_000
+
+# Modules only needed for rollback or serialization, loaded on first use
+LAZY_MODULES = {"array", "asyncio", "json", "mmap", "pickle", "struct", "threading"}
+
+
+def import_times() -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import transaction"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_does_not_load_lazy_modules() -> None:
+    times = import_times()
+    assert LAZY_MODULES.isdisjoint(times)
+
+
+def test_import_time_budget() -> None:
+    times = import_times()
+    assert times["transaction"] < IMPORT_TIME_BUDGET_US
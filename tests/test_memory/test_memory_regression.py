@@ -0,0 +1,165 @@
+"""
+Memory regression tests for recording and serialization.
+
+Thresholds are roughly twice the values measured on CPython 3.11, so a test fails when memory use about doubles.
+Leak tests only count allocations made with a frame of the 'transaction' package on the stack, which leaves out
+allocations of test tooling, such as the tracer coverage starts for every new thread.
+"""
+
+import gc
+import inspect
+import os
+import sys
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import transaction
+from transaction import TransactionState
+
+# Bytes per recorded call
+RETAINED_PER_CALL = 1024
+EXPORT_PEAK_PER_CALL = 4096
+IMPORT_PEAK_PER_CALL = 2560
+PICKLE_PEAK_PER_CALL = 1024
+UNPICKLE_PEAK_PER_CALL = 1536
+# Bytes independent of the stack depth
+PEAK_OVERHEAD = 64 * 1024
+# Growth over all measured cycles
+LEAK_BYTES = 16 * 1024
+RSS_LEAK_BYTES = 4 * 1024 * 1024
+
+DEPTHS = [100, 1_000, 10_000]
+CYCLES = 200
+CALLS_PER_CYCLE = 10
+PACKAGE_FILES = str(Path(inspect.getfile(TransactionState)).parents[1] / "*")
+
+
+@transaction
+def step(i: int, name: str) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int, name: str) -> None:
+    pass
+
+
+@pytest.fixture
+def traced() -> Iterator[None]:
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+@pytest.fixture
+def traced_deep() -> Iterator[None]:
+    # Deep enough to see the package frames below the rollback and event loop frames
+    tracemalloc.start(25)
+    yield
+    tracemalloc.stop()
+
+
+def build_state(depth: int) -> TransactionState:
+    with TransactionState() as state:
+        for i in range(depth):
+            step(i, "item")
+    return state
+
+
+def peak(func: Callable[[], Any]) -> tuple[Any, int]:
+    """
+    Result of 'func' and the peak of traced memory while it ran, above the memory traced before
+    """
+    gc.collect()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    return result, tracemalloc.get_traced_memory()[1] - before
+
+
+def package_growth(cycle: Callable[[], None]) -> int:
+    """
+    Traced memory allocated by the 'transaction' package, and still alive, after CYCLES calls of 'cycle'
+    """
+    filters = [tracemalloc.Filter(True, PACKAGE_FILES, all_frames=True)]
+    for _ in range(10):
+        cycle()
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(filters)
+    for _ in range(CYCLES):
+        cycle()
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(filters)
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def commit_and_rollback_cycle() -> None:
+    with TransactionState():
+        for i in range(CALLS_PER_CYCLE):
+            step(i, "item")
+    with TransactionState(reraise=False):
+        for i in range(CALLS_PER_CYCLE):
+            step(i, "item")
+        raise ValueError("roll back")
+
+
+@pytest.mark.parametrize("depth", DEPTHS)
+def test_retained_per_call(traced: None, depth: int) -> None:
+    build_state(10)
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build_state(depth)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    assert len(state.stack) == depth
+    assert retained <= PEAK_OVERHEAD + RETAINED_PER_CALL * depth
+
+
+@pytest.mark.parametrize("depth", DEPTHS)
+def test_export_import_history_peak(traced: None, depth: int) -> None:
+    state = build_state(depth)
+    history, export_peak = peak(state.export_history)
+    imported, import_peak = peak(lambda: TransactionState.import_history(history))
+    assert len(imported.stack) == depth
+    assert export_peak <= PEAK_OVERHEAD + EXPORT_PEAK_PER_CALL * depth
+    assert import_peak <= PEAK_OVERHEAD + IMPORT_PEAK_PER_CALL * depth
+
+
+@pytest.mark.parametrize("depth", DEPTHS)
+def test_pickle_peak(traced: None, depth: int) -> None:
+    state = build_state(depth)
+    pickles, pickle_peak = peak(lambda: [call.to_pickle() for call in state.stack])
+    calls, unpickle_peak = peak(lambda: [FunctionCall.from_pickle(data) for data in pickles])
+    assert calls == state.stack
+    assert pickle_peak <= PEAK_OVERHEAD + PICKLE_PEAK_PER_CALL * depth
+    assert unpickle_peak <= PEAK_OVERHEAD + UNPICKLE_PEAK_PER_CALL * depth
+
+
+def test_no_leak_across_cycles(traced_deep: None) -> None:
+    assert package_growth(commit_and_rollback_cycle) <= LEAK_BYTES
+
+
+async def test_no_leak_across_threaded_rollbacks(traced_deep: None) -> None:
+    # With a running event loop, the sync rollback in '__exit__' runs on a new event loop in a new thread
+    assert package_growth(commit_and_rollback_cycle) <= LEAK_BYTES
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Reads the RSS from /proc")
+def test_rss_stable_across_cycles() -> None:
+    def rss() -> int:
+        gc.collect()
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    for _ in range(100):
+        commit_and_rollback_cycle()
+    before = rss()
+    for _ in range(5 * CYCLES):
+        commit_and_rollback_cycle()
+    assert rss() - before <= RSS_LEAK_BYTES
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.recovery import recover_histories
+
+undone: list[tuple[int, int]] = []
+
+
+@transaction
+def step(history: int, i: int) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(history: int, i: int) -> None:
+    if history == 3 and i == 1:
+        raise ValueError("undo failed")
+    undone.append((history, i))
+
+
+def make_history(history: int, calls: int = 3) -> TransactionState:
+    with TransactionState() as state:
+        for i in range(calls):
+            step(history, i)
+    return state
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_recover_histories(processes: int) -> None:
+    undone.clear()
+    histories: list[str | bytes] = [make_history(i).export_history() for i in range(5)]
+    histories.append(make_history(5).export_compressed())
+    histories.append("not json")
+
+    report = recover_histories(histories, processes=processes, concurrency=2, batch_size=2)
+
+    assert [outcome.index for outcome in report.outcomes] == list(range(7))
+    assert [outcome.success for outcome in report.outcomes] == [True, True, True, False, True, True, False]
+    assert report.succeeded == 5
+    assert report.failed == 2
+    assert report.outcomes[3].error == "ValueError: undo failed"
+    assert report.outcomes[3].rolled_back == 1
+    assert report.outcomes[6].error.startswith("JSONDecodeError")
+    assert report.outcomes[0].calls == 3
+    assert report.throughput > 0
+    for history in (0, 1, 2, 4, 5):
+        assert [i for h, i in undone if h == history] == [2, 1, 0]
+    assert "5 succeeded, 2 failed" in str(report)
+
+
+def test_recover_skips_rolled_back_calls() -> None:
+    undone.clear()
+    state = make_history(7)
+    state.stack[2].rolled_back = True
+    report = recover_histories([state.export_history()], processes=0)
+
+    assert report.outcomes[0].success is True
+    assert report.outcomes[0].rolled_back == 3
+    assert undone == [(7, 1), (7, 0)]
+
+
+def test_recover_unresolvable_rollback() -> None:
+    history = json.dumps(
+        [{"name": "f", "args": [], "kwargs": {}, "rollback_func": "missing_module.func", "rolled_back": False}]
+    )
+    report = recover_histories([history], processes=0)
+    assert report.outcomes[0].success is False
+    assert report.outcomes[0].error.startswith("ImportError")
+
+
+progress = {"read": 0, "rolled_back": 0}
+backlog: list[int] = []
+
+
+@transaction
+def tracked(i: int) -> int:
+    return i
+
+
+@tracked.rollback
+async def undo_tracked(i: int) -> None:
+    await asyncio.sleep(0)
+    progress["rolled_back"] += 1
+    # Histories read but not rolled back yet
+    backlog.append(progress["read"] - progress["rolled_back"])
+
+
+def test_decoding_waits_for_rollbacks() -> None:
+    with TransactionState() as state:
+        tracked(1)
+    history = state.export_history()
+
+    def histories() -> Iterator[str]:
+        for _ in range(100):
+            progress["read"] += 1
+            yield history
+
+    progress.update(read=0, rolled_back=0)
+    backlog.clear()
+    report = recover_histories(histories(), processes=0, concurrency=2, batch_size=5)
+    assert report.succeeded == 100
+    # Rolling back, at most one batch waiting for a slot, and the batches being decoded and read
+    assert max(backlog) <= 2 + 3 * 5
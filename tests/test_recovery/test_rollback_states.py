@@ -0,0 +1,86 @@
+import asyncio
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.recovery import rollback_states
+from transaction.recovery import rollback_states_async
+
+undone: list[tuple[int, int]] = []
+running = {"now": 0, "peak": 0}
+
+
+@transaction
+def step(state_id: int, i: int) -> int:
+    return i
+
+
+@step.rollback
+async def undo_step(state_id: int, i: int) -> None:
+    running["now"] += 1
+    running["peak"] = max(running["peak"], running["now"])
+    await asyncio.sleep(0.001)
+    running["now"] -= 1
+    if state_id == 2 and i == 1:
+        raise ValueError("undo failed")
+    undone.append((state_id, i))
+
+
+@transaction
+async def async_step(state_id: int, i: int) -> int:
+    return i
+
+
+@async_step.rollback
+async def undo_async_step(state_id: int, i: int) -> None:
+    await undo_step(state_id, i)
+
+
+def make_state(state_id: int, calls: int = 3) -> TransactionState:
+    with TransactionState() as state:
+        for i in range(calls):
+            step(state_id, i)
+    return state
+
+
+def test_rollback_states() -> None:
+    undone.clear()
+    running["peak"] = 0
+    states = [make_state(i) for i in range(4)]
+    states.append(TransactionState.import_history(make_state(4).export_history()))
+
+    report = rollback_states(states, concurrency=2)
+
+    assert [outcome.index for outcome in report.outcomes] == list(range(5))
+    assert [outcome.success for outcome in report.outcomes] == [True, True, False, True, True]
+    assert report.outcomes[2].error == "ValueError: undo failed"
+    assert report.outcomes[2].rolled_back == 1
+    assert sum(outcome.rolled_back for outcome in report.outcomes) == 13
+    assert running["peak"] == 2
+    for state_id in (0, 1, 3, 4):
+        assert [i for s, i in undone if s == state_id] == [2, 1, 0]
+
+
+async def test_rollback_states_async_resumes() -> None:
+    undone.clear()
+    states = [make_state(i) for i in range(3)]
+
+    first = await rollback_states_async(states)
+    assert first.failed == 1
+    second = await rollback_states_async(states)
+    assert second.failed == 1
+    assert [outcome.rolled_back for outcome in second.outcomes] == [3, 3, 1]
+    assert len(undone) == 7
+
+
+async def test_concurrency_limits_calls_of_branches() -> None:
+    undone.clear()
+    running["peak"] = 0
+    state = TransactionState()
+    async with state:
+        async with state.task_group() as group:
+            for i in range(4):
+                group.create_task(async_step(5, i))
+
+    report = await rollback_states_async([state], concurrency=2)
+    assert report.outcomes[0].rolled_back == 4
+    assert running["peak"] == 2
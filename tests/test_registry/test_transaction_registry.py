@@ -0,0 +1,88 @@
+import gc
+import json
+import socket
+import urllib.request
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.registry import TransactionRegistry
+
+
+@transaction
+def step(i: int) -> int:
+    return i
+
+
+@pytest.fixture
+def registry() -> Iterator[TransactionRegistry]:
+    yield TransactionRegistry.install()
+    TransactionRegistry.uninstall()
+
+
+def test_states_join_and_leave(registry: TransactionRegistry) -> None:
+    with TransactionState() as outer:
+        step(1)
+        step(2)
+        with TransactionState() as inner:
+            step(3)
+            snapshot = registry.snapshot()
+            assert registry.states() == [outer, inner]
+        assert len(registry) == 1
+    assert len(registry) == 0
+
+    assert snapshot["count"] == 2
+    assert [item["depth"] for item in snapshot["transactions"]] == [2, 1]
+    assert snapshot["transactions"][0]["id"] == id(outer)
+    assert snapshot["transactions"][0]["age"] >= snapshot["transactions"][1]["age"]
+    assert snapshot["transactions"][0]["stats"]["calls_by_function"] == {"step": 2}
+
+
+def test_registry_is_opt_in() -> None:
+    assert TransactionState.registry is None
+    registry = TransactionRegistry()
+    with TransactionState():
+        assert len(registry) == 0
+
+
+def test_registry_holds_weak_references(registry: TransactionRegistry) -> None:
+    state = TransactionState()
+    registry.register(state)
+    assert len(registry) == 1
+    del state
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_serve_tcp(registry: TransactionRegistry) -> None:
+    server = registry.serve(("127.0.0.1", 0))
+    try:
+        host, port = server.server_address[:2]  # type: ignore[misc]
+        with TransactionState():
+            with urllib.request.urlopen(f"http://{host}:{port}/") as response:
+                data = json.loads(response.read())
+        assert data["count"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_unix_socket(registry: TransactionRegistry, tmp_path: Path) -> None:
+    path = str(tmp_path / "registry.sock")
+    server = registry.serve(path)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            response = b""
+            while chunk := client.recv(4096):
+                response += chunk
+        headers, body = response.split(b"\r\n\r\n", 1)
+        assert headers.startswith(b"HTTP/1.0 200")
+        assert json.loads(body)["count"] == 0
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,213 @@
+import multiprocessing
+import os
+import uuid
+from collections.abc import Iterator
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+from transaction.shared_log import CALL
+from transaction.shared_log import END
+from transaction.shared_log import HEADER
+from transaction.shared_log import segment_name
+from transaction.shared_log import SharedMemoryLog
+
+undone: list[int] = []
+
+
+@transaction
+def step(i: int) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int) -> None:
+    undone.append(i)
+
+
+@pytest.fixture
+def log() -> Iterator[SharedMemoryLog]:
+    log = SharedMemoryLog.install(name=f"transaction-test-{uuid.uuid4().hex[:12]}", size=4096)
+    yield log
+    SharedMemoryLog.uninstall()
+    log.unlink()
+
+
+def test_pending_calls(log: SharedMemoryLog) -> None:
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        with TransactionState() as state:
+            step(1)
+            with state.partition("a"):
+                step(2)
+            step(3)
+            state.rollback(partition="a")
+            pending = reader.pending()
+            assert [[item["args"] for item in items] for items in pending] == [[[1], [2], [3]]]
+            assert [item["rolled_back"] for item in pending[0]] == [False, True, False]
+            assert reader.pid == os.getpid()
+        assert reader.pending() == []
+    finally:
+        reader.close()
+
+
+def test_finished_transactions_are_dropped(log: SharedMemoryLog) -> None:
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        with TransactionState():
+            step(1)
+            with TransactionState():
+                step(2)
+            step(3)
+            assert [[item["args"] for item in items] for items in reader.pending()] == [[[1], [3]]]
+        assert log._end == HEADER.size
+    finally:
+        reader.close()
+
+
+def test_full_log_raises_before_call(log: SharedMemoryLog) -> None:
+    calls = []
+
+    @transaction
+    def big(value: str) -> None:
+        calls.append(value)
+
+    with TransactionState(reraise=False) as state:
+        with pytest.raises(BufferError):
+            big("x" * 5000)
+    assert calls == []
+    assert state.stack == []
+
+
+def test_states_not_entered_are_not_logged(log: SharedMemoryLog) -> None:
+    with TransactionState() as state:
+        step(1)
+        step(2)
+    history = state.export_history()
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        imported = TransactionState.import_history(history)
+        assert reader.pending() == []
+        with imported:
+            assert [[item["args"] for item in items] for items in reader.pending()] == [[[1], [2]]]
+        assert reader.pending() == []
+        assert log._open == {}
+    finally:
+        reader.close()
+
+
+def test_long_transaction_reuses_space(log: SharedMemoryLog) -> None:
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        with TransactionState() as state:
+            step(-1)
+            with state.partition("a"):
+                step(-2)
+            state.rollback(partition="a")
+            # Far more than 4096 bytes of records over the life of the outer transaction
+            for i in range(200):
+                with TransactionState():
+                    step(i)
+            assert [[item["args"] for item in items] for items in reader.pending()] == [[[-1]]]
+    finally:
+        reader.close()
+
+
+def test_reused_transaction_id_skips_exited_records(log: SharedMemoryLog) -> None:
+    log._write(CALL, 1, 0, b'{"args":[0]}')
+    for seq in range(2):
+        log._write(CALL, 7, seq, b'{"args":[1]}')
+    del log._open[7]
+    log._write(END, 7, -1, b"")
+    # An exited transaction id logged again, like 'id()' of a collected state
+    log._write(CALL, 7, 0, b'{"args":[2]}')
+    log._compact()
+    assert [[item["args"] for item in items] for items in log.pending()] == [[[0]], [[2]]]
+    assert log._live_size() == log._end - log._start
+    log._open.clear()
+
+
+def test_entered_states_get_new_transaction_ids(log: SharedMemoryLog) -> None:
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        with TransactionState():
+            step(0)
+            state = TransactionState()
+            with state:
+                step(1)
+                first_id = state._log_id
+            assert state._log_id is None
+            with state:
+                step(2)
+                assert state._log_id != first_id
+                log._compact()
+                assert log._live_size() == log._end - log._start
+                pending = reader.pending()
+            assert [[item["args"] for item in items] for items in pending] == [[[0]], [[1], [2]]]
+    finally:
+        reader.close()
+
+
+def test_args_that_are_not_json(log: SharedMemoryLog) -> None:
+    reader = SharedMemoryLog.attach(log.name)
+    try:
+        with TransactionState():
+            assert step(Marker()) == Marker()  # type: ignore[arg-type]
+            assert [[item["args"] for item in items] for items in reader.pending()] == [[["Marker()"]]]
+    finally:
+        reader.close()
+
+
+class Marker:
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Marker)
+
+    def __hash__(self) -> int:
+        return 0
+
+    def __repr__(self) -> str:
+        return "Marker()"
+
+
+def test_close_keeps_segment_with_open_transactions() -> None:
+    log = SharedMemoryLog.create(name=f"transaction-test-{uuid.uuid4().hex[:12]}", size=4096)
+    with TransactionState() as state:
+        step(1)
+        log.record(state, state.stack[0])
+    log.close()
+    reader = SharedMemoryLog.attach(log.name)
+    assert len(reader.pending()) == 1
+    reader.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedMemoryLog.attach(log.name)
+
+
+def crashing_worker(prefix: str) -> None:
+    SharedMemoryLog.install(name=segment_name(os.getpid(), prefix=prefix))
+    with TransactionState():
+        step(1)
+        with TransactionState():
+            step(2)
+        step(3)
+        os._exit(1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork is not available")
+def test_recover_crashed_worker() -> None:
+    prefix = f"transaction-test-{uuid.uuid4().hex[:12]}"
+    process = multiprocessing.get_context("fork").Process(target=crashing_worker, args=(prefix,))
+    process.start()
+    process.join()
+    assert process.exitcode == 1
+
+    undone.clear()
+    log = SharedMemoryLog.attach(segment_name(process.pid, prefix=prefix))
+    try:
+        assert log.pid == process.pid
+        report = log.recover()
+    finally:
+        log.unlink()
+    assert report.succeeded == 1
+    assert report.outcomes[0].rolled_back == 2
+    assert undone == [3, 1]
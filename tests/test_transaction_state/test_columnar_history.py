@@ -0,0 +1,102 @@
+import csv
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from transaction import ColumnarHistory
+from transaction import transaction
+from transaction import TransactionState
+
+
+@transaction
+def step(i: int) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int) -> None:
+    if i == 1:
+        raise ValueError("undo failed")
+
+
+@transaction
+def other(i: int) -> int:
+    return i
+
+
+@other.rollback
+def undo_other(i: int) -> None:
+    pass
+
+
+def make_states() -> list[TransactionState]:
+    committed = TransactionState()
+    with committed:
+        step(0)
+        other(0)
+    failed = TransactionState()
+    with pytest.raises(ValueError):
+        with failed:
+            step(1)
+            other(2)
+            raise RuntimeError("fail")
+    return [committed, failed]
+
+
+def test_columns_of_states() -> None:
+    history = ColumnarHistory.from_states(make_states())
+
+    assert len(history) == 4
+    assert list(history.columns["state"]) == [0, 0, 1, 1]
+    assert list(history.columns["seq"]) == [0, 1, 0, 1]
+    assert history.decoded("name") == ["step", "other", "step", "other"]
+    assert list(history.columns["name"]) == [0, 1, 0, 1]
+    assert list(history.columns["rolled_back"]) == [0, 0, 0, 1]
+    assert history.decoded("exception") == [None, None, "ValueError: undo failed", None]
+    assert all(value > 0 for value in history.columns["recorded_at"])
+    assert [math.isnan(value) for value in history.columns["rolled_back_at"]] == [True, True, False, False]
+    assert history.columns["rollback_duration"][3] >= 0
+
+
+def test_write_and_read(tmp_path: Path) -> None:
+    history = ColumnarHistory.from_states(make_states())
+    assert history.write(tmp_path / "columns") == 4
+
+    schema = json.loads((tmp_path / "columns" / "schema.json").read_text())
+    assert schema["rows"] == 4
+    assert schema["columns"]["seq"] == "<i8"
+    assert schema["columns"]["recorded_at"] == "<f8"
+    assert schema["columns"]["rolled_back"] == "|i1"
+    assert (tmp_path / "columns" / "recorded_at.bin").stat().st_size == 4 * 8
+
+    loaded = ColumnarHistory.read(tmp_path / "columns")
+    assert loaded.dictionaries == history.dictionaries
+    for name, column in history.columns.items():
+        assert [repr(value) for value in loaded.columns[name]] == [repr(value) for value in column]
+
+
+def test_export_columnar(tmp_path: Path) -> None:
+    state = make_states()[1]
+    assert state.export_columnar(str(tmp_path)) == 2
+    assert ColumnarHistory.read(tmp_path).decoded("name") == ["step", "other"]
+
+
+def test_write_csv(tmp_path: Path) -> None:
+    history = ColumnarHistory.from_states(make_states())
+    assert history.write_csv(tmp_path / "calls.csv", batch_size=3) == 4
+
+    with open(tmp_path / "calls.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == ["step", "other", "step", "other"]
+    assert rows[2]["exception"] == "ValueError: undo failed"
+    assert rows[0]["exception"] == ""
+
+
+def test_numpy_loads_columns(tmp_path: Path) -> None:
+    numpy = pytest.importorskip("numpy")
+    ColumnarHistory.from_states(make_states()).write(tmp_path)
+    schema = json.loads((tmp_path / "schema.json").read_text())
+    seq = numpy.fromfile(tmp_path / "seq.bin", dtype=schema["columns"]["seq"])
+    assert seq.tolist() == [0, 1, 0, 1]
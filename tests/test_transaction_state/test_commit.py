@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import transaction
+from transaction import TransactionState
+
+events: list[str] = []
+
+
+@transaction
+def publish(topic: str) -> None:
+    events.append(f"publish {topic}")
+
+
+@publish.commit
+def commit_publish(calls: list[FunctionCall]) -> None:
+    events.append(f"commit publish {[call.args[0] for call in calls]}")
+
+
+@transaction
+def reserve(item: str, allow: bool = True) -> None:
+    events.append(f"reserve {item}")
+
+
+@reserve.rollback
+def undo_reserve(item: str, allow: bool = True) -> None:
+    events.append(f"undo reserve {item}")
+
+
+@reserve.prepare
+def prepare_reserve(calls: list[FunctionCall]) -> bool:
+    events.append("prepare reserve")
+    return all(call.kwargs.get("allow", True) for call in calls)
+
+
+@reserve.commit
+async def commit_reserve(calls: list[FunctionCall]) -> None:
+    await asyncio.sleep(0.05)
+    events.append(f"commit reserve {len(calls)}")
+
+
+@transaction
+async def flush(key: str) -> None:
+    events.append(f"flush {key}")
+
+
+@flush.commit
+async def commit_flush(calls: list[FunctionCall]) -> None:
+    await asyncio.sleep(0.05)
+    if any(call.args[0] == "bad" for call in calls):
+        raise ValueError("flush failed")
+    events.append(f"commit flush {len(calls)}")
+
+
+def test_commit_runs_batched_on_success() -> None:
+    events.clear()
+    with TransactionState() as state:
+        publish("a")
+        reserve("x")
+        publish("b")
+        reserve("y")
+        assert events == ["publish a", "reserve x", "publish b", "reserve y"]
+
+    assert events[4:] == ["prepare reserve", "commit publish ['a', 'b']", "commit reserve 2"]
+    # Commit only calls are queued, not recorded for rollback
+    assert [call.name for call in state.stack] == ["reserve", "reserve"]
+
+
+def test_commit_is_not_run_on_failure() -> None:
+    events.clear()
+    with pytest.raises(RuntimeError, match="fail"):
+        with TransactionState():
+            publish("a")
+            reserve("x")
+            raise RuntimeError("fail")
+    assert events == ["publish a", "reserve x", "undo reserve x"]
+
+
+def test_reentered_state_does_not_commit_rolled_back_calls() -> None:
+    events.clear()
+    state = TransactionState(reraise=False)
+    with state:
+        publish("from-failed-attempt")
+        raise RuntimeError("fail")
+    with state:
+        publish("from-second-attempt")
+    assert events[-1] == "commit publish ['from-second-attempt']"
+
+
+async def test_reentered_state_does_not_commit_rolled_back_calls_async() -> None:
+    events.clear()
+    state = TransactionState(reraise=False)
+    async with state:
+        publish("from-failed-attempt")
+        raise RuntimeError("fail")
+    async with state:
+        publish("from-second-attempt")
+    assert events[-1] == "commit publish ['from-second-attempt']"
+
+
+def test_partition_rollback_drops_its_commits() -> None:
+    events.clear()
+    with TransactionState() as state:
+        with state.partition("a"):
+            publish("a")
+        with state.partition("b"):
+            publish("b")
+        state.rollback(partition="a")
+    assert events[-1] == "commit publish ['b']"
+
+
+def test_prepare_vetoes_commit() -> None:
+    events.clear()
+    with pytest.raises(RuntimeError, match="Commit vetoed by prepare_reserve"):
+        with TransactionState():
+            publish("a")
+            reserve("x")
+            reserve("y", allow=False)
+    assert events == ["publish a", "reserve x", "reserve y", "prepare reserve", "undo reserve y", "undo reserve x"]
+
+
+async def test_concurrent_commit() -> None:
+    events.clear()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    async with TransactionState(concurrent_commit=True):
+        reserve("x")
+        await flush("a")
+    assert loop.time() - start < 0.09
+    assert sorted(events[3:]) == ["commit flush 1", "commit reserve 1"]
+
+
+async def test_failing_commit_runs_other_commits() -> None:
+    events.clear()
+    with pytest.raises(ValueError, match="flush failed"):
+        async with TransactionState() as state:
+            await flush("bad")
+            publish("a")
+    assert events == ["flush bad", "publish a", "commit publish ['a']"]
+    assert state.get_current() is None
+
+
+async def test_sync_commit_inside_running_loop() -> None:
+    events.clear()
+    with TransactionState():
+        reserve("x")
+    assert events == ["reserve x", "prepare reserve", "commit reserve 1"]
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import transaction
+from transaction import TransactionState
+from transaction.classes.compressed_history import CompressedHistory
+
+
+@transaction
+def step(i: int, label: str = "x") -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int, label: str = "x") -> None:
+    pass
+
+
+@pytest.fixture
+def state() -> TransactionState:
+    with TransactionState() as state:
+        for i in range(5000):
+            step(i, label=f"label-{i % 7}")
+        state.stack[10].rolled_back = True
+        state.stack[11].exception = "Boom!"
+    return state
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_compressed_roundtrip(state: TransactionState, codec: str) -> None:
+    data = state.export_compressed(codec=codec, level=1)
+    imported = TransactionState.import_compressed(data)
+    assert json.loads(imported.export_history()) == json.loads(state.export_history())
+    assert imported.stack[0].rollback_func is undo_step
+
+
+def test_compressed_is_smaller(state: TransactionState) -> None:
+    assert len(state.export_compressed()) * 10 < len(state.export_history().encode())
+
+
+def test_compressed_stream_decode(state: TransactionState, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("transaction.classes.compressed_history.CHUNK_SIZE", 256)
+    stream = io.BytesIO(state.export_compressed(codec="lzma"))
+    calls = CompressedHistory.decode(stream)
+    first = next(calls)
+    assert first.args == (0,)
+    assert stream.tell() < len(stream.getvalue())
+    assert sum(1 for _ in calls) == 4999
+
+
+def test_compressed_extra_fields() -> None:
+    call = FunctionCall(name="f", args=(1,), kwargs={}, instance_key="key-1")
+    (decoded,) = CompressedHistory.decode(CompressedHistory.encode([call]))
+    assert decoded.instance_key == "key-1"
+    assert decoded.rollback_func is None
+
+
+def test_compressed_invalid() -> None:
+    with pytest.raises(ValueError, match="Not a compressed history"):
+        TransactionState.import_compressed(b"garbage")
+    with pytest.raises(ValueError, match="Unknown codec"):
+        TransactionState().export_compressed(codec="zip")
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+
+@transaction
+def step(i: int) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int) -> None:
+    if i == 3:
+        raise ValueError("undo failed")
+
+
+def test_export_delta_only_contains_new_calls() -> None:
+    mirror = TransactionState()
+    with TransactionState() as state:
+        step(1)
+        step(2)
+        first = state.export_delta()
+        step(4)
+        second = state.export_delta()
+        third = state.export_delta()
+
+    assert [item["args"] for item in json.loads(first)["records"]] == [[1], [2]]
+    assert [item["args"] for item in json.loads(second)["records"]] == [[4]]
+    assert json.loads(third) == {"cursor": state.export_cursor, "records": [], "updates": []}
+
+    for delta in (first, second, third):
+        mirror.apply_delta(delta)
+    assert json.loads(mirror.export_history()) == json.loads(state.export_history())
+    assert [call.seq for call in mirror.stack] == [0, 1, 2]
+
+
+def test_export_delta_contains_status_updates() -> None:
+    mirror = TransactionState()
+    with TransactionState() as state:
+        step(1)
+        step(3)
+        step(2)
+        mirror.apply_delta(state.export_delta())
+
+        with pytest.raises(ValueError, match="undo failed"):
+            state.rollback()
+        delta = json.loads(state.export_delta())
+
+    assert delta["records"] == []
+    assert delta["updates"] == [
+        {"seq": 2, "rolled_back": True, "exception": None, "completed": True},
+        {"seq": 1, "rolled_back": False, "exception": "ValueError: undo failed", "completed": True},
+    ]
+
+    mirror.apply_delta(json.dumps(delta))
+    assert [(call.rolled_back, call.exception) for call in mirror.stack] == [
+        (False, None),
+        (False, "ValueError: undo failed"),
+        (True, None),
+    ]
+
+
+def test_export_delta_since_cursor() -> None:
+    with TransactionState() as state:
+        step(1)
+        cursor = json.loads(state.export_delta())["cursor"]
+        step(2)
+        state.export_delta()
+
+    replay = json.loads(state.export_delta(since=cursor))
+    assert [item["args"] for item in replay["records"]] == [[2]]
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        state.export_delta(since=100)
+
+
+def test_export_delta_trims_journal() -> None:
+    with TransactionState() as state:
+        first = json.loads(state.export_delta())["cursor"]
+        for i in range(100):
+            step(i)
+        second = json.loads(state.export_delta())["cursor"]
+        step(100)
+        third = json.loads(state.export_delta())["cursor"]
+
+    assert len(state._journal) == third - second
+    retry = json.loads(state.export_delta(since=second))
+    assert [item["args"] for item in retry["records"]] == [[100]]
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        state.export_delta(since=first)
+
+
+def test_apply_delta_unknown_call() -> None:
+    delta = json.dumps({"cursor": 1, "records": [], "updates": [{"seq": 5, "rolled_back": True}]})
+    with pytest.raises(KeyError):
+        TransactionState().apply_delta(delta)
+
+
+@pytest.mark.asyncio
+async def test_export_delta_includes_branches() -> None:
+    @transaction
+    async def astep(i: int) -> int:
+        return i
+
+    async with TransactionState() as state:
+        await astep(0)
+        state.export_delta()
+        async with state.task_group() as tg:
+            tg.create_task(astep(1))
+            tg.create_task(astep(2))
+        delta = json.loads(state.export_delta())
+
+    assert sorted(item["args"][0] for item in delta["records"]) == [1, 2]
+
+
+@transaction
+def notify(i: int) -> None:
+    pass
+
+
+@notify.commit
+def commit_notify(calls: list) -> None:
+    pass
+
+
+def test_export_delta_skips_commit_only_calls() -> None:
+    mirror = TransactionState()
+    with TransactionState() as state:
+        step(1)
+        mirror.apply_delta(state.export_delta())
+        notify(2)
+        delta = state.export_delta()
+
+    assert json.loads(delta)["updates"] == []
+    mirror.apply_delta(delta)
+    assert json.loads(mirror.export_history()) == json.loads(state.export_history())
@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import HistoryFile
+from transaction import transaction
+from transaction import TransactionState
+
+rolled_back: list[int] = []
+
+
+@transaction
+def step(i: int) -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int) -> None:
+    rolled_back.append(i)
+
+
+@pytest.fixture
+def history_path(tmp_path: Path) -> str:
+    with TransactionState() as state:
+        for i in range(100):
+            step(i)
+        state.stack[5].rolled_back = True
+        state.stack[6].exception = "Boom!"
+        state.export_history_file(str(tmp_path / "history.bin"))
+    return str(tmp_path / "history.bin")
+
+
+def test_history_file_random_access(history_path: str) -> None:
+    with HistoryFile(history_path) as history:
+        assert len(history) == 100
+        assert history[42].args == (42,)
+        assert history[-1].args == (99,)
+        assert history[5].rolled_back is True
+        assert history[6].exception == "Boom!"
+        assert history[42].rollback_func is undo_step
+        assert [call.args[0] for call in history[10:13]] == [10, 11, 12]
+        with pytest.raises(IndexError):
+            history[100]
+
+
+def test_history_file_raw_is_zero_copy(history_path: str) -> None:
+    with HistoryFile(history_path) as history:
+        raw = history.raw(3)
+        assert isinstance(raw, memoryview)
+        assert json.loads(raw.tobytes())["args"] == [3]
+        raw.release()
+
+
+def test_history_file_reverse_iteration(history_path: str) -> None:
+    with HistoryFile(history_path) as history:
+        assert [call.args[0] for call in reversed(history)] == list(range(99, -1, -1))
+
+
+def test_mapped_state_rollback(history_path: str) -> None:
+    rolled_back.clear()
+    state = TransactionState.open_history_file(history_path)
+    try:
+        state.rollback()
+        assert rolled_back == [i for i in range(99, -1, -1) if i != 5]
+        assert json.loads(state.export_history())[6]["exception"] == "Boom!"
+        with pytest.raises(TypeError, match="read-only"):
+            state.record_call(FunctionCall(name="x", args=(), kwargs={}))
+    finally:
+        state.close()
+
+
+def test_mapped_state_rollback_twice(history_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    resolved: list[str] = []
+    resolve = FunctionCall._resolve_function
+
+    def counting_resolve(qualified_name: str) -> object:
+        resolved.append(qualified_name)
+        return resolve(qualified_name)
+
+    monkeypatch.setattr(FunctionCall, "_resolve_function", staticmethod(counting_resolve))
+    rolled_back.clear()
+    state = TransactionState.open_history_file(history_path)
+    try:
+        state.rollback()
+        state.rollback()
+        assert rolled_back == [i for i in range(99, -1, -1) if i != 5]
+        assert all(call.rolled_back for call in state.stack)
+        assert len(resolved) == 1
+    finally:
+        state.close()
+
+
+def test_invalid_history_file(tmp_path: Path) -> None:
+    path = tmp_path / "invalid.bin"
+    path.write_bytes(b"not a history file at all, really not")
+    with pytest.raises(ValueError, match="not a history file"):
+        HistoryFile(str(path))
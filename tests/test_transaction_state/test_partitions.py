@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+undone: list[tuple[str, int]] = []
+
+
+@transaction(partition=lambda tenant, i: tenant)
+def write(tenant: str, i: int) -> None:
+    pass
+
+
+@write.rollback
+def undo_write(tenant: str, i: int) -> None:
+    undone.append((tenant, i))
+
+
+@transaction
+async def send(i: int) -> None:
+    pass
+
+
+@send.rollback
+async def undo_send(i: int) -> None:
+    undone.append(("send", i))
+
+
+def test_rollback_partition_leaves_other_partitions() -> None:
+    undone.clear()
+    with TransactionState() as state:
+        for i in range(3):
+            write("a", i)
+            write("b", i)
+        state.rollback(partition="a")
+        assert undone == [("a", 2), ("a", 1), ("a", 0)]
+        write("b", 3)
+
+    assert [call.args for call in state.partition_calls("b")] == [("b", 0), ("b", 1), ("b", 2), ("b", 3)]
+    assert state.partition_calls("missing") == []
+
+    undone.clear()
+    state.rollback()
+    assert undone == [("b", 3), ("b", 2), ("b", 1), ("b", 0)]
+
+
+async def test_partition_scope_and_branches() -> None:
+    undone.clear()
+    async with TransactionState() as state:
+        with state.partition("x"):
+            await send(1)
+            write("a", 1)
+            async with state.task_group() as group:
+                group.create_task(send(2))
+        await send(3)
+
+    assert [call.partition for call in state.iter_calls()] == ["x", "a", "x", None]
+    results = [result async for result in state.rollback_iter(partition="x")]
+    assert [result.call.args for result in results] == [(2,), (1,)]
+    assert undone == [("send", 2), ("send", 1)]
+
+
+async def test_partition_is_exported() -> None:
+    async with TransactionState() as state:
+        write("a", 1)
+        with state.partition(7):
+            await send(2)
+
+    assert [item.get("partition") for item in json.loads(state.export_history())] == ["a", 7]
+    imported = TransactionState.import_compressed(state.export_compressed())
+    assert [call.args for call in imported.partition_calls(7)] == [(2,)]
+
+
+async def test_tuple_partition_survives_export() -> None:
+    async with TransactionState() as state:
+        with state.partition(("tenant", 1)):
+            await send(1)
+        delta = state.export_delta()
+
+    imported = TransactionState.import_history(state.export_history())
+    assert [call.args for call in imported.partition_calls(("tenant", 1))] == [(1,)]
+
+    replica = TransactionState()
+    replica.apply_delta(delta)
+    assert [call.partition for call in replica.iter_calls()] == [("tenant", 1)]
+
+    undone.clear()
+    await imported.rollback_async(partition=("tenant", 1))
+    assert undone == [("send", 1)]
+
+
+def test_failed_partition_rollback_raises() -> None:
+    @transaction(partition=lambda i: "p")
+    def no_rollback(i: int) -> None:
+        pass
+
+    with TransactionState() as state:
+        no_rollback(1)
+    with pytest.raises(RuntimeError, match="No rollback function"):
+        state.rollback(partition="p")
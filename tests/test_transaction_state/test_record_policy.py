@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from transaction import RecordPolicy
+from transaction import transaction
+from transaction import TransactionState
+
+undone: list[int] = []
+
+
+@transaction
+def read(i: int) -> int:
+    return i
+
+
+@transaction(record_policy="all")
+def audited_read(i: int) -> int:
+    return i
+
+
+@transaction
+def write(i: int) -> int:
+    return i
+
+
+@write.rollback
+def undo_write(i: int) -> None:
+    undone.append(i)
+
+
+def run(state: TransactionState) -> None:
+    with pytest.raises(ValueError):
+        with state:
+            for i in range(5):
+                read(i)
+                write(i)
+            raise ValueError("fail")
+
+
+def test_default_policy_records_every_call() -> None:
+    state = TransactionState()
+    with pytest.raises(RuntimeError, match="No rollback function for read"):
+        run(state)
+    assert len(state.stack) == 10
+
+
+def test_skip_policy_only_records_compensable_calls() -> None:
+    undone.clear()
+    state = TransactionState(record_policy=RecordPolicy.SKIP)
+    run(state)
+    assert [call.name for call in state.stack] == ["write"] * 5
+    assert undone == [4, 3, 2, 1, 0]
+
+
+def test_marker_policy_records_lightweight_markers() -> None:
+    undone.clear()
+    state = TransactionState(record_policy="marker")
+    run(state)
+    markers = [call for call in state.stack if call.marker]
+    assert [call.name for call in markers] == ["read"] * 5
+    assert all(call.args == () and call.kwargs == {} and not call.rolled_back for call in markers)
+    assert undone == [4, 3, 2, 1, 0]
+
+    history = json.loads(state.export_history())
+    assert history[0] == {
+        "name": "read",
+        "args": [],
+        "kwargs": {},
+        "rollback_func": None,
+        "rolled_back": False,
+        "exception": None,
+        "marker": True,
+    }
+    assert "marker" not in history[1]
+    imported = TransactionState.import_compressed(state.export_compressed())
+    assert [call.marker for call in imported.stack] == [call.marker for call in state.stack]
+
+
+def test_sample_policy_records_one_of_every_n() -> None:
+    undone.clear()
+    state = TransactionState(record_policy=RecordPolicy.SAMPLE, sample_every=2)
+    run(state)
+    assert [(call.name, call.args) for call in state.stack] == [
+        ("read", ()),
+        ("write", (0,)),
+        ("write", (1,)),
+        ("read", ()),
+        ("write", (2,)),
+        ("write", (3,)),
+        ("read", ()),
+        ("write", (4,)),
+    ]
+    assert undone == [4, 3, 2, 1, 0]
+
+
+def test_wrapper_policy_overrides_state_policy() -> None:
+    with TransactionState(record_policy=RecordPolicy.SKIP) as state:
+        read(1)
+        audited_read(2)
+        branch = state.branch()
+    assert [(call.name, call.args) for call in state.stack] == [("audited_read", (2,))]
+    assert branch.record_policy is RecordPolicy.SKIP
+
+
+def test_invalid_policy() -> None:
+    with pytest.raises(ValueError):
+        TransactionState(record_policy="nope")
+    with pytest.raises(ValueError):
+        TransactionState(sample_every=0)
@@ -0,0 +1,186 @@
+import json
+from typing import Any
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+executed: list[Any] = []
+
+
+@transaction(capture_result=True)
+def download(url: str) -> str:
+    executed.append(url)
+    return f"file-{url}"
+
+
+@download.rollback
+def undo_download(url: str, result: str | None = None) -> None:
+    pass
+
+
+@transaction(idempotency_key=lambda order: order["id"], capture_result=True)
+async def charge(order: dict[str, Any]) -> int:
+    executed.append(order["id"])
+    if order.get("fail"):
+        raise RuntimeError("charge failed")
+    return order["amount"]
+
+
+@charge.rollback
+async def refund(order: dict[str, Any], result: int | None = None) -> None:
+    pass
+
+
+def workflow(fail_at: str | None = None) -> list[str]:
+    files = []
+    for url in ("a", "b", "a", "c"):
+        if url == fail_at:
+            raise RuntimeError("interrupted")
+        files.append(download(url))
+    return files
+
+
+def test_resume_skips_completed_calls() -> None:
+    executed.clear()
+    state = TransactionState(reraise=False)
+    with state:
+        # Interrupted before "c", without rolling back the completed calls
+        try:
+            workflow(fail_at="c")
+        except RuntimeError:
+            exported = state.export_history()
+    assert all(item["completed"] for item in json.loads(exported))
+
+    executed.clear()
+    with TransactionState.import_history(exported, resume=True) as resumed:
+        assert workflow() == ["file-a", "file-b", "file-a", "file-c"]
+    assert executed == ["c"]
+    assert [call.args for call in resumed.stack] == [("a",), ("b",), ("a",), ("c",)]
+
+
+def test_without_resume_calls_run_again() -> None:
+    with TransactionState() as state:
+        workflow()
+    executed.clear()
+    with TransactionState.import_history(state.export_history()) as imported:
+        workflow()
+    assert executed == ["a", "b", "a", "c"]
+    assert len(imported.stack) == 8
+
+
+async def test_resume_by_idempotency_key() -> None:
+    state = TransactionState()
+    async with state:
+        assert await charge({"id": "o1", "amount": 5}) == 5
+        with pytest.raises(RuntimeError):
+            await charge({"id": "o2", "amount": 7, "fail": True})
+    history = json.loads(state.export_history())
+    assert [item.get("completed", False) for item in history] == [True, False]
+    assert history[0]["idempotency_key"] == "o1"
+
+    executed.clear()
+    resumed = TransactionState.import_compressed(state.export_compressed(), resume=True)
+    async with resumed:
+        # The key matches even though the other fields changed
+        assert await charge({"id": "o1", "amount": 0, "retry": 1}) == 5
+        assert await charge({"id": "o2", "amount": 7}) == 7
+    assert executed == ["o2"]
+
+
+def test_rolled_back_calls_are_not_resumed() -> None:
+    state = TransactionState()
+    with pytest.raises(RuntimeError):
+        with state:
+            workflow(fail_at="c")
+    executed.clear()
+    with TransactionState.import_history(state.export_history(), resume=True):
+        workflow()
+    assert executed == ["a", "b", "a", "c"]
+
+
+@transaction(capture_result=lambda response: response["id"])
+def create(name: str) -> dict[str, Any]:
+    executed.append(name)
+    return {"id": f"id-{name}", "name": name}
+
+
+def test_resume_returns_whole_result() -> None:
+    executed.clear()
+    with TransactionState() as state:
+        assert create("a") == {"id": "id-a", "name": "a"}
+    item = json.loads(state.export_history())[0]
+    assert item["result"] == "id-a"
+    assert item["return_value"] == {"id": "id-a", "name": "a"}
+
+    executed.clear()
+    with TransactionState.import_history(state.export_history(), resume=True):
+        assert create("a") == {"id": "id-a", "name": "a"}
+    assert executed == []
+
+
+@transaction
+def ping(name: str) -> str:
+    executed.append(name)
+    return f"pong-{name}"
+
+
+@ping.rollback
+def undo_ping(name: str) -> None:
+    pass
+
+
+def test_calls_without_captured_result_run_again() -> None:
+    with TransactionState() as state:
+        ping("a")
+    executed.clear()
+    with TransactionState.import_history(state.export_history(), resume=True):
+        assert ping("a") == "pong-a"
+    assert executed == ["a"]
+
+
+class Account:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @transaction(instance_key=lambda account: account.name, capture_result=True)
+    def deposit(self, amount: int) -> str:
+        executed.append((self.name, amount))
+        return f"{self.name}+{amount}"
+
+    @deposit.rollback
+    def withdraw(name: str, amount: int, result: str | None = None) -> None:
+        pass
+
+    @transaction(capture_result=True)
+    def touch(self, amount: int) -> int:
+        executed.append((self.name, amount))
+        return amount
+
+    @touch.rollback
+    def untouch(self, amount: int, result: int | None = None) -> None:
+        pass
+
+
+def test_resume_matches_instance_key() -> None:
+    a, b = Account("a"), Account("b")
+    with TransactionState() as state:
+        a.deposit(10)
+    executed.clear()
+    with TransactionState.import_history(state.export_history(), resume=True):
+        assert b.deposit(10) == "b+10"
+        assert a.deposit(10) == "a+10"
+    assert executed == [("b", 10)]
+
+
+def test_bound_calls_without_instance_key_run_again() -> None:
+    a, b = Account("a"), Account("b")
+    state = TransactionState()
+    with state:
+        a.touch(1)
+    state.resume = True
+    executed.clear()
+    with state:
+        b.touch(1)
+    assert executed == [("b", 1)]
@@ -0,0 +1,100 @@
+import asyncio
+
+from transaction import RollbackResult
+from transaction import transaction
+from transaction import TransactionState
+
+undone: list[int] = []
+
+
+@transaction
+async def step(i: int, delay: float = 0) -> int:
+    return i
+
+
+@step.rollback
+async def undo_step(i: int, delay: float = 0) -> None:
+    await asyncio.sleep(delay)
+    if i < 0:
+        raise ValueError(f"undo {i} failed")
+    undone.append(i)
+
+
+async def record(state: TransactionState, *calls: int) -> None:
+    async with state:
+        for i in calls:
+            await step(i)
+
+
+async def test_rollback_iter_yields_results_in_rollback_order() -> None:
+    undone.clear()
+    state = TransactionState()
+    await record(state, 1, 2, 3)
+
+    results = []
+    async for result in state.rollback_iter():
+        assert isinstance(result, RollbackResult)
+        # Results are yielded while the rollback runs
+        assert undone[-1] == result.call.args[0]
+        results.append(result)
+
+    assert [result.call.args for result in results] == [(3,), (2,), (1,)]
+    assert all(result.success and result.error is None and result.duration >= 0 for result in results)
+
+    # Calls rolled back already are skipped
+    assert [result async for result in state.rollback_iter()] == []
+
+
+async def test_rollback_iter_yields_failures() -> None:
+    state = TransactionState()
+    await record(state, 1, -2, 3)
+
+    results = [result async for result in state.rollback_iter()]
+    assert [(result.call.args[0], result.success) for result in results] == [(3, True), (-2, False)]
+    assert results[1].error == "ValueError: undo -2 failed"
+    assert not state.stack[0].rolled_back
+
+
+async def test_rollback_iter_yields_concurrent_branch_results_as_they_complete() -> None:
+    state = TransactionState()
+    async with state:
+        async with state.task_group() as group:
+            group.create_task(step(1, delay=0.05))
+            group.create_task(step(2, delay=0.01))
+            group.create_task(step(-3, delay=0.03))
+
+    results = [result async for result in state.rollback_iter()]
+    assert [(result.call.args[0], result.success) for result in results] == [(2, True), (-3, False), (1, True)]
+
+
+async def test_leaving_rollback_iter_cancels_rollback() -> None:
+    undone.clear()
+    state = TransactionState()
+    async with state:
+        await step(1)
+        await step(2, delay=0.05)
+        await step(3)
+
+    async for result in state.rollback_iter():
+        assert result.call.args == (3,)
+        break
+    await asyncio.sleep(0.1)
+    assert undone == [3]
+    assert not state.stack[1].rolled_back
+
+    await state.rollback_async()
+    assert undone == [3, 2, 1]
+
+
+async def test_rollback_iter_requires_rollback_function() -> None:
+    @transaction
+    def no_rollback() -> None:
+        pass
+
+    with TransactionState() as state:
+        no_rollback()
+    results = [result async for result in state.rollback_iter()]
+    assert (
+        results[0].error
+        == "No rollback function for test_rollback_iter_requires_rollback_function.<locals>.no_rollback"
+    )
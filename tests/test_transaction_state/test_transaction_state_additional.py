@@ -15,3 +15,25 @@ async def test_rollback_in_running_loop() -> None:  # type: ignore[return-value]
 
     with pytest.raises(ValueError, match="fail"):
         state.rollback()
+
+
+def test_recent_calls_match_iter_calls() -> None:
+    state = TransactionState()
+
+    def record(target: TransactionState, name: str) -> None:
+        target.record_call(FunctionCall(name=name, args=(), kwargs={}))
+
+    first = state.branch()
+    record(first, "b0")
+    record(state, "s0")
+    nested = first.branch()
+    record(nested, "n0")
+    record(first, "b1")
+    record(state, "s1")
+    last = state.branch()
+    record(last, "l0")
+    record(state.branch(), "empty-stack-branch")
+
+    names = [call.name for call in state.iter_calls()]
+    for count in range(len(names) + 2):
+        assert [call.name for call in state.recent_calls(count)] == names[max(len(names) - count, 0) :]
@@ -0,0 +1,83 @@
+import asyncio
+import sys
+
+import pytest
+
+from transaction import transaction
+from transaction import TransactionState
+
+
+@transaction
+def step(i: int, payload: bytes = b"") -> int:
+    return i
+
+
+@step.rollback
+def undo_step(i: int, payload: bytes = b"") -> None:
+    if i == 1:
+        raise ValueError("undo failed")
+
+
+@transaction
+async def async_step(i: int) -> int:
+    return i
+
+
+@async_step.rollback
+async def undo_async_step(i: int) -> None:
+    await asyncio.sleep(0.05)
+
+
+def test_stats_track_recorded_calls() -> None:
+    payload = b"x" * 1000
+    with TransactionState() as state:
+        assert state.stats.elapsed > 0
+        step(0)
+        step(2, payload=payload)
+        step(3)
+    elapsed = state.stats.elapsed
+    assert elapsed == state.stats.elapsed
+
+    assert state.stats.calls == 3
+    assert state.stats.calls_by_function == {"step": 3}
+    assert state.stats.retained_bytes >= sys.getsizeof(payload)
+    assert state.stats.rolled_back == state.stats.rollback_failed == 0
+
+
+def test_stats_track_rollback_outcomes() -> None:
+    state = TransactionState()
+    with pytest.raises(ValueError, match="undo failed"):
+        with state:
+            step(0)
+            step(1)
+            step(2)
+            raise RuntimeError("fail")
+
+    assert state.stats.rolled_back == 1
+    assert state.stats.rollback_failed == 1
+    assert state.stats.rollback_duration > 0
+    assert state.stats.to_dict()["rolled_back"] == 1
+
+
+async def test_branches_share_stats() -> None:
+    state = TransactionState()
+    with pytest.raises(RuntimeError):
+        async with state:
+            async with state.task_group() as group:
+                group.create_task(async_step(1))
+                group.create_task(async_step(2))
+            raise RuntimeError("fail")
+
+    assert all(branch.stats is state.stats for branch in state.branches)
+    assert state.stats.calls_by_function == {"async_step": 2}
+    assert state.stats.rolled_back == 2
+    # Branches are rolled back concurrently, so the duration is less than the sum of both rollbacks
+    assert 0.05 <= state.stats.rollback_duration < 0.1
+
+
+def test_clear_resets_call_stats() -> None:
+    with TransactionState() as state:
+        step(0)
+        state.clear()
+    assert state.stats.calls == 0
+    assert state.stats.retained_bytes == 0
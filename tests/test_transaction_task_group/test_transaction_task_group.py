@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+from transaction import FunctionCall
+from transaction import transaction
+from transaction import TransactionState
+
+events: list[tuple[str, int]] = []
+
+
+@transaction
+async def step(i: int) -> int:
+    await asyncio.sleep(0.001 * (i % 3))
+    events.append(("step", i))
+    if i == 99:
+        raise ValueError("step failed")
+    return i
+
+
+@step.rollback
+async def undo_step(i: int) -> None:
+    events.append(("undo", i))
+
+
+@transaction
+async def slow_step(i: int) -> int:
+    events.append(("slow", i))
+    await asyncio.sleep(10)
+    return i
+
+
+@slow_step.rollback
+def undo_slow_step(i: int) -> None:
+    events.append(("undo_slow", i))
+
+
+async def branch_work(i: int) -> None:
+    await step(i * 10)
+    await step(i * 10 + 1)
+
+
+@pytest.mark.asyncio
+async def test_task_group_records_on_branches() -> None:
+    events.clear()
+    async with TransactionState() as state:
+        await step(0)
+        async with state.task_group() as tg:
+            for i in range(1, 4):
+                tg.create_task(branch_work(i))
+        await step(1)
+
+    assert [call.args for call in state.stack] == [(0,), (1,)]
+    assert len(state.branches) == 3
+    for i, branch in enumerate(state.branches, start=1):
+        assert [call.args for call in branch.stack] == [(i * 10,), (i * 10 + 1,)]
+
+    exported = json.loads(state.export_history())
+    assert [item["args"] for item in exported] == [[0], [10], [11], [20], [21], [30], [31], [1]]
+
+
+@pytest.mark.asyncio
+async def test_task_group_rollback_order() -> None:
+    events.clear()
+    with pytest.raises(ValueError):
+        async with TransactionState() as state:
+            await step(0)
+            async with state.task_group() as tg:
+                tg.create_task(branch_work(1))
+                tg.create_task(branch_work(2))
+            raise ValueError("abort")
+
+    rollbacks = [i for kind, i in events if kind == "undo"]
+    # Branches are undone before the call recorded ahead of them, with reverse order inside each branch.
+    assert rollbacks[-1] == 0
+    assert rollbacks.index(11) < rollbacks.index(10)
+    assert rollbacks.index(21) < rollbacks.index(20)
+    assert sorted(rollbacks) == [0, 10, 11, 20, 21]
+    assert all(call.rolled_back for call in state.iter_calls())
+
+
+@pytest.mark.asyncio
+async def test_task_group_cancels_siblings_on_failure() -> None:
+    events.clear()
+
+    async def failing() -> None:
+        await asyncio.sleep(0.01)
+        await step(99)
+
+    with pytest.raises(ExceptionGroup):
+        async with TransactionState() as state:
+            async with state.task_group() as tg:
+                tg.create_task(slow_step(1))
+                tg.create_task(failing())
+
+    assert ("undo", 99) in events
+    assert ("undo_slow", 1) in events
+    assert [branch.stack[0].rolled_back for branch in state.branches] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_task_group_without_cancel_waits_for_all() -> None:
+    events.clear()
+
+    async def failing() -> None:
+        await step(99)
+
+    with pytest.raises(ExceptionGroup):
+        async with TransactionState() as state:
+            async with state.task_group(cancel_on_error=False) as tg:
+                tg.create_task(failing())
+                tg.create_task(branch_work(1))
+
+    assert ("step", 11) in events
+    assert sorted(i for kind, i in events if kind == "undo") == [10, 11, 99]
+
+
+@pytest.mark.asyncio
+async def test_branch_rollback_failure_is_raised() -> None:
+    def failing_rollback() -> None:
+        raise RuntimeError("rollback failed")
+
+    state = TransactionState()
+    state.branch().record_call(FunctionCall(name="ok", args=(), kwargs={}, rollback_func=lambda: None))
+    state.branch().record_call(FunctionCall(name="bad", args=(), kwargs={}, rollback_func=failing_rollback))
+
+    with pytest.raises(RuntimeError, match="rollback failed"):
+        await state.rollback_async()
+    assert state.branches[0].stack[0].rolled_back is True
@@ -1,9 +1,50 @@
+from typing import Any
+from typing import TYPE_CHECKING
+
+from transaction import classes
 from transaction.classes import FunctionCall
+from transaction.classes import PartialBatchError
+from transaction.classes import RecoveryOutcome
+from transaction.classes import RecoveryReport
+from transaction.classes import RollbackResult
 from transaction.classes import TransactionState
+from transaction.classes import TransactionStats
+from transaction.classes import TransactionTaskGroup
 from transaction.decorator import transaction
+from transaction.helpers import RecordPolicy
+
+if TYPE_CHECKING:
+    from transaction.classes import ColumnarHistory
+    from transaction.classes import HistoryFile
+    from transaction.classes import MappedTransactionState
 
 __all__ = [
     "transaction",
+    "ColumnarHistory",
     "FunctionCall",
+    "HistoryFile",
+    "MappedTransactionState",
+    "PartialBatchError",
+    "RecordPolicy",
+    "RecoveryOutcome",
+    "RecoveryReport",
+    "RollbackResult",
     "TransactionState",
+    "TransactionStats",
+    "TransactionTaskGroup",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the classes of 'transaction.classes.LAZY_CLASSES' on first access
+
+    Args:
+        name: str
+
+    Returns:
+        Any
+    """
+    if name not in classes.LAZY_CLASSES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(classes, name)
@@ -1,7 +1,54 @@
+from typing import Any
+from typing import TYPE_CHECKING
+
 from transaction.classes.function_call import FunctionCall
+from transaction.classes.partial_batch_error import PartialBatchError
+from transaction.classes.recovery_report import RecoveryOutcome
+from transaction.classes.recovery_report import RecoveryReport
+from transaction.classes.rollback_result import RollbackResult
 from transaction.classes.transaction_state import TransactionState
+from transaction.classes.transaction_stats import TransactionStats
+from transaction.classes.transaction_task_group import TransactionTaskGroup
+
+if TYPE_CHECKING:
+    from transaction.classes.columnar_history import ColumnarHistory
+    from transaction.classes.history_file import HistoryFile
+    from transaction.classes.history_file import MappedTransactionState
+
+# Classes loaded on first access, with the module defining them
+LAZY_CLASSES = {
+    "ColumnarHistory": "transaction.classes.columnar_history",
+    "HistoryFile": "transaction.classes.history_file",
+    "MappedTransactionState": "transaction.classes.history_file",
+}
 
 __all__ = [
+    "ColumnarHistory",
     "FunctionCall",
+    "HistoryFile",
+    "MappedTransactionState",
+    "PartialBatchError",
+    "RecoveryOutcome",
+    "RecoveryReport",
+    "RollbackResult",
     "TransactionState",
+    "TransactionStats",
+    "TransactionTaskGroup",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the classes of 'LAZY_CLASSES' on first access
+
+    Args:
+        name: str
+
+    Returns:
+        Any
+    """
+    if name not in LAZY_CLASSES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(LAZY_CLASSES[name]), name)
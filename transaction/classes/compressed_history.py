@@ -0,0 +1,170 @@
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
+from typing import BinaryIO
+
+from transaction.classes.function_call import FunctionCall
+
+MAGIC = b"TXNZ"
+CODECS = {"zlib": b"z", "lzma": b"x"}
+CHUNK_SIZE = 64 * 1024
+FIELDS = ("name", "args", "kwargs", "rollback_func", "rolled_back", "exception")
+
+
+class CompressedHistory:
+    """
+    Class to encode call history as compressed, newline-delimited JSON with interned names.
+
+    Every 'name' and 'rollback_func' string is written once, as a JSON string line, the first time it is used.
+    Records refer to it by its position in that symbol table:
+        [name_id, args, kwargs, rollback_func_id or -1, rolled_back, exception(, other to_dict() keys)]
+    """
+
+    @staticmethod
+    def encode(calls: Iterable[FunctionCall], codec: str = "zlib", level: int = 6) -> bytes:
+        """
+        Encode 'calls'
+
+        Args:
+            calls: Iterable[FunctionCall]
+            codec: str
+                "zlib" or "lzma"
+            level: int
+                Compression level (zlib 0-9, lzma preset 0-9)
+
+        Returns:
+            bytes
+        """
+        import json
+
+        compressor = _compressor(codec, level)
+        symbols: dict[str, int] = {}
+        chunks = [MAGIC, CODECS[codec]]
+        lines: list[str] = []
+
+        def intern(value: str | None) -> int:
+            if value is None:
+                return -1
+            if value not in symbols:
+                symbols[value] = len(symbols)
+                lines.append(json.dumps(value))
+            return symbols[value]
+
+        for call in calls:
+            data = call.to_dict()
+            record = [
+                intern(data.pop("name")),
+                data.pop("args"),
+                data.pop("kwargs"),
+                intern(data.pop("rollback_func")),
+                data.pop("rolled_back"),
+                data.pop("exception"),
+            ]
+            if data:
+                record.append(data)
+            lines.append(json.dumps(record, separators=(",", ":")))
+            if len(lines) >= 1024:
+                chunks.append(compressor.compress(("\n".join(lines) + "\n").encode()))
+                lines.clear()
+
+        if lines:
+            chunks.append(compressor.compress(("\n".join(lines) + "\n").encode()))
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
+
+    @staticmethod
+    def decode(data: bytes | BinaryIO) -> Iterator[FunctionCall]:
+        """
+        Stream-decode calls encoded by 'encode'.  Decompression happens in chunks, so only one chunk and the
+        symbol table are held in memory at a time.
+
+        Args:
+            data: bytes | BinaryIO
+                Encoded bytes, or a binary file opened for reading
+
+        Returns:
+            Iterator[FunctionCall]
+        """
+        import json
+
+        chunks = _chunks(data)
+        header = next(chunks, b"")
+        while len(header) < len(MAGIC) + 1:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            header += chunk
+        if header[: len(MAGIC)] != MAGIC:
+            raise ValueError("Not a compressed history")
+        decompressor = _decompressor(header[len(MAGIC) : len(MAGIC) + 1])
+
+        symbols: list[str] = []
+        resolved: dict[str, Any] = {}
+
+        def resolve(qualified_name: str) -> Any:
+            # Rollback functions are resolved once per symbol instead of once per record
+            if qualified_name not in resolved:
+                resolved[qualified_name] = FunctionCall._resolve_function(qualified_name)
+            return resolved[qualified_name]
+
+        pending = b""
+        for chunk in _prepend(header[len(MAGIC) + 1 :], chunks):
+            pending += decompressor.decompress(chunk)
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                item = json.loads(line)
+                if isinstance(item, str):
+                    symbols.append(item)
+                    continue
+                yield FunctionCall.from_dict(_record_to_dict(item, symbols), resolve=resolve)
+        if pending.strip():
+            raise ValueError("Truncated compressed history")
+
+
+def _record_to_dict(record: list[Any], symbols: list[str]) -> dict[str, Any]:
+    data: dict[str, Any] = dict(zip(FIELDS, record))
+    data["name"] = symbols[record[0]]
+    data["rollback_func"] = symbols[record[3]] if record[3] >= 0 else None
+    if len(record) > len(FIELDS):
+        data.update(record[len(FIELDS)])
+    return data
+
+
+def _compressor(codec: str, level: int) -> Any:
+    if codec == "zlib":
+        import zlib
+
+        return zlib.compressobj(level)
+    if codec == "lzma":
+        import lzma
+
+        return lzma.LZMACompressor(preset=level)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def _decompressor(codec_id: bytes) -> Any:
+    if codec_id == CODECS["zlib"]:
+        import zlib
+
+        return zlib.decompressobj()
+    if codec_id == CODECS["lzma"]:
+        import lzma
+
+        return lzma.LZMADecompressor()
+    raise ValueError(f"Unknown codec: {codec_id!r}")
+
+
+def _chunks(data: bytes | BinaryIO) -> Iterator[bytes]:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield bytes(view[start : start + CHUNK_SIZE])
+        return
+    while chunk := data.read(CHUNK_SIZE):
+        yield chunk
+
+
+def _prepend(first: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if first:
+        yield first
+    yield from chunks
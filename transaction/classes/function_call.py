@@ -1,9 +1,9 @@
-import importlib
 import inspect
-import json
-import pickle
 from collections.abc import Callable
 from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from operator import attrgetter
 from typing import Any
 from typing import cast
 from typing import Union
@@ -25,6 +25,20 @@ class FunctionCall:
     rollback_func: Callable[..., Any] | None = None  # noqa
     rolled_back: bool = False
     exception: str | None = None
+    instance_ref: Callable[[], Any] | None = field(default=None, compare=False, repr=False)
+    instance_key: Any = None
+    seq: int | None = field(default=None, compare=False)
+    marker: bool = False
+    result: Any = None
+    result_captured: bool = False
+    return_value: Any = None
+    return_captured: bool = False
+    partition: Any = None
+    idempotency_key: Any = None
+    completed: bool = False
+    recorded_at: float | None = field(default=None, compare=False, repr=False)
+    rolled_back_at: float | None = field(default=None, compare=False, repr=False)
+    rollback_duration: float | None = field(default=None, compare=False, repr=False)
 
     def __str__(self) -> str:
         """
@@ -38,6 +52,7 @@ class FunctionCall:
         """
         Execute 'self.rollback_func' and mark 'self.rolled_back' to True.
         'self.rollback_func' is a custom function to rollback the current function.
+        A captured result of the call is passed as the 'result' keyword argument.
 
         Returns:
             None
@@ -48,12 +63,25 @@ class FunctionCall:
             raise RuntimeError(self.exception)
 
         try:
+            args = self.args
+            if self.instance_ref is not None:
+                instance = self.instance_ref()
+                if instance is None:
+                    raise RuntimeError(f"Instance for {self.name} no longer exists")
+                args = (instance, *args)
+            elif self.instance_key is not None:
+                args = (self.instance_key, *args)
+
+            kwargs = self.kwargs
+            if self.result_captured:
+                kwargs = {**kwargs, "result": self.result}
+
             func_type = inspect_function(self.rollback_func)
             if func_type == FunctionType.CLASS_METHOD:
                 class_type = get_class(self.rollback_func)
-                result = self.rollback_func(class_type, *self.args, **self.kwargs)
+                result = self.rollback_func(class_type, *args, **kwargs)
             else:
-                result = self.rollback_func(*self.args, **self.kwargs)
+                result = self.rollback_func(*args, **kwargs)
 
             if inspect.isawaitable(result):
                 await result
@@ -70,16 +98,82 @@ class FunctionCall:
             dict[str, Any]
                 dict representation of FunctionCall
         """
-        return {
+        data = {
             "name": self.name,
             "args": self.args,
             "kwargs": self.kwargs,
-            "rollback_func": (
-                f"{self.rollback_func.__module__}.{self.rollback_func.__name__}" if self.rollback_func else None
-            ),
+            "rollback_func": self._qualified_name(self.rollback_func) if self.rollback_func else None,
+            "rolled_back": self.rolled_back,
+            "exception": self.exception,
+        }
+        if self.instance_key is not None:
+            data["instance_key"] = self.instance_key
+        elif self.instance_ref is not None:
+            # The instance can not be exported, see '__reduce__'
+            data["bound"] = True
+        if self.marker:
+            data["marker"] = True
+        if self.result_captured:
+            data["result"] = self.result
+        if self.return_captured:
+            data["return_value"] = self.return_value
+        if self.partition is not None:
+            data["partition"] = self.partition
+        if self.idempotency_key is not None:
+            data["idempotency_key"] = self.idempotency_key
+        if self.completed:
+            data["completed"] = True
+        return data
+
+    def status(self) -> dict[str, Any]:
+        """
+        Returns the part of 'to_dict()' that can change after the call was recorded
+
+        Returns:
+            dict[str, Any]
+        """
+        data = {
             "rolled_back": self.rolled_back,
             "exception": self.exception,
         }
+        if self.result_captured:
+            data["result"] = self.result
+        if self.return_captured:
+            data["return_value"] = self.return_value
+        if self.completed:
+            data["completed"] = True
+        return data
+
+    def apply_status(self, data: dict[str, Any]) -> None:
+        """
+        Update 'self' from a dict created by 'status()'
+
+        Args:
+            data: dict
+                Representation of the status of a FunctionCall.
+
+        Returns:
+            None
+        """
+        self.rolled_back = data.get("rolled_back", self.rolled_back)
+        self.exception = data.get("exception", self.exception)
+        if "result" in data:
+            self.result = data["result"]
+            self.result_captured = True
+        if "return_value" in data:
+            self.return_value = data["return_value"]
+            self.return_captured = True
+        self.completed = data.get("completed", self.completed)
+
+    def resumed_result(self) -> Any:
+        """
+        Return value of the completed call, for a call resumed from it
+
+        Returns:
+            Any
+                'self.return_value' when 'capture_result' extracted a part of it, 'self.result' otherwise
+        """
+        return self.return_value if self.return_captured else self.result
 
     def to_json(self) -> str:
         """
@@ -89,6 +183,8 @@ class FunctionCall:
             str
                 JSON string representation of FunctionCall
         """
+        import json
+
         return json.dumps(self.to_dict(), indent=4)
 
     def to_pickle(self) -> bytes:
@@ -99,9 +195,25 @@ class FunctionCall:
             bytes
                 Pickled instance version of FunctionCall
         """
+        import pickle
 
         return pickle.dumps(self)
 
+    def __reduce__(self) -> tuple[type["FunctionCall"], tuple[Any, ...]]:
+        """
+        Pickle support.  Pickles the field values, which unpickle faster than the attribute dict.  A weak reference
+        to the instance can not be pickled, so it is replaced by an expired reference, and the rollback of an
+        unpickled bound method call reports the instance as gone.
+
+        Returns:
+            tuple
+                Class and field values, in field order
+        """
+        values = _field_values(self)
+        if self.instance_ref is not None:
+            values = values[:_INSTANCE_REF] + (_expired_ref,) + values[_INSTANCE_REF + 1 :]
+        return type(self), values
+
     @classmethod
     def from_pickle(cls, pickle_bytes: bytes) -> Union["FunctionCall", Any]:
         """
@@ -114,6 +226,8 @@ class FunctionCall:
         Returns:
             FunctionCall
         """
+        import pickle
+
         return cast(FunctionCall, pickle.loads(pickle_bytes))
 
     @classmethod
@@ -130,10 +244,14 @@ class FunctionCall:
         Returns:
             FunctionCall
         """
+        import json
+
         return cls.from_dict(json.loads(in_json))
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "FunctionCall":
+    def from_dict(
+        cls, data: dict[str, Any], resolve: Callable[[str], Callable[..., Any]] | None = None
+    ) -> "FunctionCall":
         """
         Convert from dict to FunctionCall.
 
@@ -142,11 +260,15 @@ class FunctionCall:
         Args:
             data: dict
                 Representation of FunctionCall.
+            resolve: Callable | None
+                Function converting the 'rollback_func' name to a callable, such as a cached version of
+                'cls._resolve_function'.  Defaults to 'cls._resolve_function'.
         Returns:
             FunctionCall
 
         """
-        rollback_func = cls._resolve_function(data["rollback_func"]) if data["rollback_func"] else None
+        resolve = resolve or cls._resolve_function
+        rollback_func = resolve(data["rollback_func"]) if data["rollback_func"] else None
         return cls(
             name=data["name"],
             args=tuple(data["args"]),
@@ -154,8 +276,36 @@ class FunctionCall:
             rollback_func=rollback_func,
             rolled_back=data.get("rolled_back", False),
             exception=data.get("exception"),
+            instance_ref=_expired_ref if data.get("bound") else None,
+            instance_key=_hashable(data.get("instance_key")),
+            marker=data.get("marker", False),
+            result=data.get("result"),
+            result_captured="result" in data,
+            return_value=data.get("return_value"),
+            return_captured="return_value" in data,
+            partition=_hashable(data.get("partition")),
+            idempotency_key=_hashable(data.get("idempotency_key")),
+            completed=data.get("completed", False),
         )
 
+    @staticmethod
+    def _qualified_name(func: Callable[..., Any]) -> str:
+        """
+        Dot notation name of 'func', matching '_resolve_function'.
+        Functions defined in a class keep the class in the name, functions defined inside another function
+        only keep their own name.
+
+        Args:
+            func: Callable
+
+        Returns:
+            str
+        """
+        qualname = getattr(func, "__qualname__", func.__name__)
+        if "<locals>" in qualname:
+            qualname = func.__name__
+        return f"{func.__module__}.{qualname}"
+
     @staticmethod
     def _resolve_function(qualified_name: str) -> Callable[..., Any]:
         """
@@ -168,7 +318,45 @@ class FunctionCall:
         Returns:
 
         """
-        module_name, func_name = qualified_name.rsplit(".", 1)
-        module = importlib.import_module(module_name)
-        func = getattr(module, func_name)
-        return func  # type: ignore[no-any-return]
+        import importlib
+
+        parts = qualified_name.split(".")
+        for index in range(len(parts) - 1, 0, -1):
+            try:
+                func = importlib.import_module(".".join(parts[:index]))
+            except ImportError:
+                continue
+            for attr in parts[index:]:
+                func = getattr(func, attr)
+            return func  # type: ignore[return-value]
+        raise ImportError(f"Unable to resolve {qualified_name}")
+
+
+def _expired_ref() -> None:
+    """
+    Stand-in for a weak reference that can not be pickled or exported.  Always reports the instance as gone.
+
+    Returns:
+        None
+    """
+    return None
+
+
+def _hashable(value: Any) -> Any:
+    """
+    Turn the lists of a key read back from JSON into the tuples it was exported from.
+
+    Args:
+        value: Any
+            Partition, instance or idempotency key as loaded from JSON.
+    Returns:
+        Any
+    """
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+_FIELD_NAMES = [item.name for item in fields(FunctionCall)]
+_field_values = attrgetter(*_FIELD_NAMES)
+_INSTANCE_REF = _FIELD_NAMES.index("instance_ref")
@@ -0,0 +1,270 @@
+import mmap
+import struct
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any
+from typing import overload
+
+from transaction.classes.function_call import FunctionCall
+from transaction.classes.transaction_state import TransactionState
+
+MAGIC = b"TXNHIST1"
+FOOTER = struct.Struct("<QQ8s")
+OFFSET = struct.Struct("<Q")
+
+
+class HistoryFile(Sequence[FunctionCall]):
+    """
+    Class representation of a history file opened with 'mmap'.
+
+    A history file holds one JSON record per call, followed by an index of record offsets, so any call can be
+    read without decoding the others.
+
+    Layout:
+        MAGIC, records, index of 'count + 1' little endian uint64 offsets, footer (index offset, count, MAGIC)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open 'path' read-only
+
+        Args:
+            path: str
+                Path of a file created by 'HistoryFile.write'
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < len(MAGIC) + FOOTER.size or self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a history file")
+        self._index_offset, self._count, magic = FOOTER.unpack_from(self._mmap, len(self._mmap) - FOOTER.size)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a complete history file")
+        self._view = memoryview(self._mmap)
+        self._functions: dict[str, Callable[..., Any]] = {}
+
+    @staticmethod
+    def write(path: str, calls: Iterable[FunctionCall]) -> int:
+        """
+        Write 'calls' to 'path', one record at a time
+
+        Args:
+            path: str
+            calls: Iterable[FunctionCall]
+
+        Returns:
+            int
+                Number of calls written
+        """
+        import json
+        import sys
+        from array import array
+
+        offsets = array("Q")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            position = len(MAGIC)
+            for call in calls:
+                offsets.append(position)
+                position += f.write(json.dumps(call.to_dict(), separators=(",", ":")).encode())
+            offsets.append(position)
+            if sys.byteorder == "big":
+                offsets.byteswap()
+            offsets.tofile(f)
+            f.write(FOOTER.pack(position, len(offsets) - 1, MAGIC))
+        return len(offsets) - 1
+
+    def raw(self, index: int) -> memoryview:
+        """
+        Zero-copy access to the JSON bytes of call 'index'
+
+        Args:
+            index: int
+
+        Returns:
+            memoryview
+        """
+        start, end = self._bounds(index)
+        return self._view[start:end]
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        """
+        Start and end offsets of record 'index'
+
+        Args:
+            index: int
+                Negative values count from the end
+
+        Returns:
+            tuple[int, int]
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        position = self._index_offset + index * OFFSET.size
+        return OFFSET.unpack_from(self._mmap, position)[0], OFFSET.unpack_from(self._mmap, position + OFFSET.size)[0]
+
+    def __len__(self) -> int:
+        return self._count  # type: ignore[no-any-return]
+
+    @overload
+    def __getitem__(self, index: int) -> FunctionCall: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[FunctionCall]: ...
+
+    def __getitem__(self, index: int | slice) -> FunctionCall | list[FunctionCall]:
+        """
+        Decode call 'index', or a list of calls for a slice
+
+        Args:
+            index: int | slice
+
+        Returns:
+            FunctionCall | list[FunctionCall]
+        """
+        import json
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        call = FunctionCall.from_dict(json.loads(self.raw(index).tobytes()), resolve=self._resolve)
+        call.seq = index if index >= 0 else index + self._count
+        return call
+
+    def _resolve(self, qualified_name: str) -> Callable[..., Any]:
+        """
+        Resolve a rollback function name once per file
+
+        Args:
+            qualified_name: str
+
+        Returns:
+            Callable
+        """
+        func = self._functions.get(qualified_name)
+        if func is None:
+            func = self._functions[qualified_name] = FunctionCall._resolve_function(qualified_name)
+        return func
+
+    def __iter__(self) -> Iterator[FunctionCall]:
+        for index in range(self._count):
+            yield self[index]
+
+    def __reversed__(self) -> Iterator[FunctionCall]:
+        for index in range(self._count - 1, -1, -1):
+            yield self[index]
+
+    def close(self) -> None:
+        """
+        Release the memory map.  Views returned by 'raw()' must be released first.
+
+        Returns:
+            None
+        """
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "HistoryFile":
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
+    ) -> None:
+        self.close()
+
+
+class _StatusOverlay(Sequence[FunctionCall]):
+    """
+    Calls of a HistoryFile, with the status changes made since it was opened applied on top
+    """
+
+    def __init__(self, history: HistoryFile) -> None:
+        self.history = history
+        self.status: dict[int, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    @overload
+    def __getitem__(self, index: int) -> FunctionCall: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[FunctionCall]: ...
+
+    def __getitem__(self, index: int | slice) -> FunctionCall | list[FunctionCall]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        call = self.history[index]
+        status = self.status.get(call.seq)  # type: ignore[arg-type]
+        if status is not None:
+            call.apply_status(status)
+        return call
+
+
+class MappedTransactionState(TransactionState):
+    """
+    Read-only TransactionState backed by a HistoryFile.  Calls are decoded when accessed, so rollback walks the
+    file in reverse without loading it.  Changes made by a rollback are kept in memory, so a call is not rolled
+    back twice, but they are not written back to the file.
+    """
+
+    def __init__(self, history: HistoryFile, reraise: bool = True) -> None:
+        """
+        Initialize MappedTransactionState
+
+        Args:
+            history: HistoryFile
+                Opened history file
+            reraise: bool
+                Should an exception be raised after rollback
+        """
+        super().__init__(reraise=reraise)
+        self.history = history
+        self._overlay = _StatusOverlay(history)
+        self.stack = self._overlay  # type: ignore[assignment]
+
+    def record_call(self, call: FunctionCall) -> None:
+        """
+        Recording is not supported on a read-only view
+
+        Args:
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        raise TypeError("MappedTransactionState is read-only")
+
+    def _changed(self, call: FunctionCall) -> None:
+        """
+        Keep the status of a rolled back call, see 'TransactionState._changed'
+
+        Args:
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        self._overlay.status[call.seq] = call.status()  # type: ignore[index]
+        super()._changed(call)
+
+    def branch(self) -> TransactionState:
+        raise TypeError("MappedTransactionState is read-only")
+
+    def clear(self) -> None:
+        raise TypeError("MappedTransactionState is read-only")
+
+    def close(self) -> None:
+        """
+        Close the underlying HistoryFile
+
+        Returns:
+            None
+        """
+        self.history.close()
@@ -0,0 +1,21 @@
+class PartialBatchError(Exception):
+    """
+    Raised by a batch step ('@transaction(batch=True)') that failed part way through its items.
+    The recorded call is narrowed to the first 'processed' items, so the rollback function only receives the items
+    that were processed.
+    """
+
+    def __init__(self, processed: int, message: str | None = None) -> None:
+        """
+        Initialize PartialBatchError
+
+        Args:
+            processed: int
+                Number of leading items that were processed before the failure
+            message: str | None
+                Error message
+        """
+        if processed < 0:
+            raise ValueError("processed must not be negative")
+        super().__init__(message or f"Batch failed after {processed} items")
+        self.processed = processed
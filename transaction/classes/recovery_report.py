@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from dataclasses import field
+
+
+@dataclass
+class RecoveryOutcome:
+    """
+    Class to represent the result of rolling back one transaction history
+    """
+
+    index: int
+    success: bool
+    calls: int = 0
+    rolled_back: int = 0
+    error: str | None = None
+    duration: float = 0.0
+    # 'seq' of every rolled back call, its position in the history for recovered histories
+    rolled_back_seqs: list[int] = field(default_factory=list)
+
+
+@dataclass
+class RecoveryReport:
+    """
+    Class to represent the results of a bulk recovery, one RecoveryOutcome per history
+    """
+
+    outcomes: list[RecoveryOutcome] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for outcome in self.outcomes if outcome.success)
+
+    @property
+    def failed(self) -> int:
+        return len(self.outcomes) - self.succeeded
+
+    @property
+    def throughput(self) -> float:
+        """
+        Histories recovered per second
+
+        Returns:
+            float
+        """
+        return len(self.outcomes) / self.duration if self.duration else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.outcomes)} histories in {self.duration:.2f}s ({self.throughput:,.0f}/s): "
+            f"{self.succeeded} succeeded, {self.failed} failed"
+        )
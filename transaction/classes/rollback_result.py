@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+from transaction.classes.function_call import FunctionCall
+
+
+@dataclass
+class RollbackResult:
+    """
+    Class to represent the outcome of rolling back one FunctionCall, yielded by 'TransactionState.rollback_iter'
+    """
+
+    call: FunctionCall
+    success: bool
+    duration: float = 0.0
+    error: str | None = None
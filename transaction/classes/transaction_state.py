@@ -1,12 +1,37 @@
-import asyncio
-import json
-import threading
+import contextlib
+import functools
+import itertools
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Coroutine
+from collections.abc import Hashable
+from collections.abc import Iterator
+from collections import deque
 from contextvars import ContextVar
 from contextvars import Token
+from typing import Any
+from typing import BinaryIO
 from typing import ClassVar
 from typing import Optional
+from typing import TYPE_CHECKING
 
 from transaction.classes.function_call import FunctionCall
+from transaction.classes.rollback_result import RollbackResult
+from transaction.classes.transaction_stats import TransactionStats
+from transaction.helpers import RecordPolicy
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from transaction.classes.history_file import MappedTransactionState
+    from transaction.classes.transaction_task_group import TransactionTaskGroup
+    from transaction.flight_recorder import FlightRecorder
+    from transaction.registry import TransactionRegistry
+    from transaction.shared_log import SharedMemoryLog
+
+# (prepare_func, commit_func) of a decorated function
+CommitHandlers = tuple[Callable[..., Any] | None, Callable[..., Any] | None]
 
 
 class TransactionState:
@@ -18,8 +43,28 @@ class TransactionState:
     _current_state: ClassVar[ContextVar["TransactionState | None"]] = ContextVar(
         "current_transaction_state", default=None
     )
+    # Registry active states join, see 'TransactionRegistry.install()'
+    registry: ClassVar["TransactionRegistry | None"] = None
+    # Recorder exited states report to, see 'FlightRecorder.install()'
+    flight_recorder: ClassVar["FlightRecorder | None"] = None
+    # Log of unfinished calls for a supervisor process, see 'SharedMemoryLog.install()'
+    shared_log: ClassVar["SharedMemoryLog | None"] = None
+    _current_partition: ClassVar[ContextVar[Hashable | None]] = ContextVar(
+        "current_transaction_partition", default=None
+    )
+    # Limit on the number of calls rolled back at the same time, shared by states, see 'rollback_states()'
+    _rollback_limit: ClassVar[ContextVar["asyncio.Semaphore | None"]] = ContextVar(
+        "transaction_rollback_limit", default=None
+    )
 
-    def __init__(self, reraise: bool = True) -> None:
+    def __init__(
+        self,
+        reraise: bool = True,
+        record_policy: RecordPolicy | str = RecordPolicy.ALL,
+        sample_every: int = 100,
+        concurrent_commit: bool = False,
+        resume: bool = False,
+    ) -> None:
         """
         Initialize TransactionState to keep track of function calls
 
@@ -27,10 +72,43 @@ class TransactionState:
             reraise: bool
                 Should an exception be raised after rollback, if the exception is thrown while executing
                 the initial functions.
+            record_policy: RecordPolicy | str
+                How calls to functions without a rollback function are recorded, unless the function sets its own
+                policy with '@transaction(record_policy=...)'.
+            sample_every: int
+                With 'RecordPolicy.SAMPLE', one of every 'sample_every' calls without a rollback function is
+                recorded as a marker.
+            concurrent_commit: bool
+                Run the prepare, and then the commit, functions of different decorated functions concurrently.
+            resume: bool
+                Resume a transaction, see 'take_completed'.
         """
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
         self.stack: list[FunctionCall] = []
+        self.branches: list[TransactionState] = []
+        self._branch_offset = 0
+        self._root = self
+        self._next_seq = 0
+        self._journal: list[tuple[bool, FunctionCall]] | None = None
+        self._export_cursor = 0
+        # Cursor of the first entry of '_journal'
+        self._journal_start = 0
         self._token: Token[TransactionState | None] | None = None
         self._reraise = reraise
+        self.record_policy = RecordPolicy(record_policy)
+        self.sample_every = sample_every
+        self._sample_count = 0
+        self.stats = TransactionStats()
+        self.concurrent_commit = concurrent_commit
+        self._commit_queue: dict[CommitHandlers, list[FunctionCall]] = {}
+        self._partitions: dict[Hashable, list[FunctionCall]] = {}
+        self.resume = resume
+        self._completed: dict[tuple[str, str], deque[FunctionCall]] | None = None
+        # Set when a commit function raised, the calls stay committed
+        self._commit_failed = False
+        # Id of the transaction in 'shared_log', while the state is entered
+        self._log_id: int | None = None
 
     def __begin(self) -> None:
         """
@@ -41,17 +119,37 @@ class TransactionState:
             None
         """
         self._token = self._current_state.set(self)
+        self.stats.started_at = time.monotonic()
+        self.stats.finished_at = None
+        self._commit_failed = False
+        if self.registry is not None:
+            self.registry.register(self)
+        if self.shared_log is not None:
+            # Calls imported before entering are pending from now on
+            for call in self.iter_calls():
+                self.shared_log.record(self, call)
 
-    def __end(self) -> None:
+    def __end(self, error: BaseException | None = None) -> None:
         """
         Helper function to end collection of function calls
 
+        Args:
+            error: BaseException | None
+                Exception the context manager exited with, or the exception of a vetoed or failed commit
+
         Returns:
             None
         """
         if self._token:
             self._current_state.reset(self._token)
             self._token = None
+            self.stats.finished_at = time.monotonic()
+            if self.registry is not None:
+                self.registry.unregister(self)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record(self, error)
+            if self.shared_log is not None:
+                self.shared_log.end(self)
 
     def __enter__(self) -> "TransactionState":
         """
@@ -65,7 +163,7 @@ class TransactionState:
 
     def __exit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: object) -> bool:
         """
-        Context Manager end
+        Context Manager end.  Rolls back on an exception, runs the commit functions otherwise.
         Args:
             exc_type:
                 If exception is thrown, this is the type of exception.
@@ -80,9 +178,18 @@ class TransactionState:
                 True: Suppress exceptions
                 False:  Reraise exception
         """
-        if exc_type:
-            self.rollback()
-        self.__end()
+        error = exc_val
+        try:
+            if exc_type:
+                self._drop_commits()
+                self.rollback()
+            else:
+                self.commit()
+        except BaseException as e:
+            error = error or e
+            raise
+        finally:
+            self.__end(error)
         return not self._reraise if exc_type else False
 
     async def __aenter__(self) -> "TransactionState":
@@ -99,7 +206,7 @@ class TransactionState:
         self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: object
     ) -> bool:
         """
-        Async Context Manager end
+        Async Context Manager end.  Rolls back on an exception, runs the commit functions otherwise.
         Args:
             exc_type:
                 If exception is thrown, this is the type of exception.
@@ -115,9 +222,18 @@ class TransactionState:
                 False:  Reraise exception
 
         """
-        if exc_type:
-            await self.rollback_async()
-        self.__end()
+        error = exc_val
+        try:
+            if exc_type:
+                self._drop_commits()
+                await self.rollback_async()
+            else:
+                await self.commit_async()
+        except BaseException as e:
+            error = error or e
+            raise
+        finally:
+            self.__end(error)
         return not self._reraise if exc_type else False
 
     def record_call(self, call: FunctionCall) -> None:
@@ -131,25 +247,496 @@ class TransactionState:
         Returns:
             None
         """
+        root = self._root
+        if call.seq is None:
+            call.seq = root._next_seq
+            root._next_seq += 1
+        elif call.seq >= root._next_seq:
+            root._next_seq = call.seq + 1
+        if call.recorded_at is None:
+            call.recorded_at = time.time()
+        if self.shared_log is not None:
+            self.shared_log.record(self, call)
         self.stack.append(call)
+        self.stats.record(call)
+        if call.partition is not None:
+            root._partitions.setdefault(call.partition, []).append(call)
+        if root._journal is not None:
+            root._journal.append((True, call))
+
+    @staticmethod
+    @contextlib.contextmanager
+    def partition(key: Hashable) -> Iterator[None]:
+        """
+        Scope in which recorded calls get partition 'key', unless their decorated function has a 'partition'
+        key function.
+
+        Args:
+            key: Hashable
+                Partition key, such as a tenant or resource id
+
+        Returns:
+            Iterator[None]
+        """
+        token = TransactionState._current_partition.set(key)
+        try:
+            yield
+        finally:
+            TransactionState._current_partition.reset(token)
+
+    def partition_calls(self, key: Hashable) -> list[FunctionCall]:
+        """
+        Calls recorded with partition 'key', in recording order, including calls recorded on branches
+
+        Args:
+            key: Hashable
+
+        Returns:
+            list[FunctionCall]
+        """
+        return list(self._root._partitions.get(key, ()))
+
+    def take_completed(
+        self,
+        name: str,
+        key: Hashable | None,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        instance_key: Hashable | None = None,
+    ) -> FunctionCall | None:
+        """
+        Find a completed call to return instead of running a decorated function again, when 'self.resume' is set.
+
+        A call matches on its instance key and its idempotency key, or on its instance key, name, args and kwargs
+        when it has no idempotency key, compared in their JSON form.  Every completed call matches once, in
+        recording order.  Calls that are rolled back, bound method calls without an instance key, and calls
+        recorded after the first lookup, never match.
+
+        Args:
+            name: str
+                Name of the decorated function
+            key: Hashable | None
+                Idempotency key of the call
+            args: Arguments
+            kwargs: KeyWord Arguments
+            instance_key: Hashable | None
+                Instance key of a bound method call
+
+        Returns:
+            FunctionCall | None
+        """
+        root = self._root
+        if root._completed is None:
+            root._completed = {}
+            for call in root.iter_calls():
+                if not call.completed or call.rolled_back or call.marker:
+                    continue
+                if call.instance_ref is not None and call.instance_key is None:
+                    continue
+                call_key = _resume_key(call.name, call.idempotency_key, call.args, call.kwargs, call.instance_key)
+                root._completed.setdefault(call_key, deque()).append(call)
+        calls = root._completed.get(_resume_key(name, key, args, kwargs, instance_key))
+        return calls.popleft() if calls else None
+
+    def queue_commit(
+        self, prepare_func: Callable[..., Any] | None, commit_func: Callable[..., Any] | None, call: FunctionCall
+    ) -> None:
+        """
+        Queue a call for the prepare and commit functions of its decorated function
+
+        Args:
+            prepare_func: Callable | None
+            commit_func: Callable | None
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        self._root._commit_queue.setdefault((prepare_func, commit_func), []).append(call)
+
+    def _drop_commits(self, partition: Hashable | None = None) -> None:
+        """
+        Forget the queued calls of the commit functions when the state, or 'partition', is rolled back
+
+        Args:
+            partition: Hashable | None
+                Only forget the calls of this partition
+
+        Returns:
+            None
+        """
+        root = self._root
+        if partition is None:
+            root._commit_queue.clear()
+            return
+        for handlers, calls in list(root._commit_queue.items()):
+            calls[:] = [call for call in calls if call.partition != partition]
+            if not calls:
+                del root._commit_queue[handlers]
+
+    def _sample(self) -> bool:
+        """
+        Count a call without a rollback function under 'RecordPolicy.SAMPLE'
+
+        Returns:
+            bool
+                True when this call should be recorded
+        """
+        root = self._root
+        count = root._sample_count
+        root._sample_count += 1
+        return count % root.sample_every == 0
+
+    def _changed(self, call: FunctionCall) -> None:
+        """
+        Note a status change of a recorded call for 'export_delta'
+
+        Args:
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        if self._root._journal is not None:
+            self._root._journal.append((False, call))
+        if self.shared_log is not None and call.rolled_back:
+            self.shared_log.rolled_back(self, call)
+
+    def branch(self) -> "TransactionState":
+        """
+        Create a child TransactionState with its own ordered sub-stack.
 
-    async def rollback_async(self) -> None:
+        The branch is rolled back as part of this state, at the point in 'self.stack' where it was created.
+        Branches created at the same point are rolled back concurrently.
+
+        Returns:
+            TransactionState
+        """
+        child = TransactionState(reraise=self._reraise, record_policy=self.record_policy)
+        child._branch_offset = len(self.stack)
+        child._root = self._root
+        child.stats = self.stats
+        self.branches.append(child)
+        return child
+
+    def task_group(self, cancel_on_error: bool = True) -> "TransactionTaskGroup":
+        """
+        Create a task group whose child tasks each record onto their own branch of this state.
+
+        Args:
+            cancel_on_error: bool
+                Cancel in-flight sibling tasks as soon as one task fails.
+
+        Returns:
+            TransactionTaskGroup
+        """
+        from transaction.classes.transaction_task_group import TransactionTaskGroup
+
+        return TransactionTaskGroup(self, cancel_on_error=cancel_on_error)
+
+    def iter_calls(self) -> Iterator[FunctionCall]:
+        """
+        Iterate over all recorded calls in recording order, including calls recorded on branches.
+        Branch calls are placed where the branch was created.
+
+        Returns:
+            Iterator[FunctionCall]
+        """
+        branch_index = 0
+        for index, call in enumerate(self.stack):
+            while branch_index < len(self.branches) and self.branches[branch_index]._branch_offset <= index:
+                yield from self.branches[branch_index].iter_calls()
+                branch_index += 1
+            yield call
+        for branch in self.branches[branch_index:]:
+            yield from branch.iter_calls()
+
+    def recent_calls(self, count: int) -> list[FunctionCall]:
+        """
+        The last 'count' recorded calls in recording order, including calls recorded on branches, see 'iter_calls'.
+        Only the recent calls are visited, however long the transaction is.
+
+        Args:
+            count: int
+
+        Returns:
+            list[FunctionCall]
+        """
+        calls = list(itertools.islice(self._iter_reversed(), count))
+        calls.reverse()
+        return calls
+
+    def _iter_reversed(self) -> Iterator[FunctionCall]:
+        """
+        Iterate over all recorded calls in reverse recording order, see 'iter_calls'
+
+        Returns:
+            Iterator[FunctionCall]
+        """
+        branch_index = len(self.branches) - 1
+        for index in range(len(self.stack) - 1, -1, -1):
+            while branch_index >= 0 and self.branches[branch_index]._branch_offset > index:
+                yield from self.branches[branch_index]._iter_reversed()
+                branch_index -= 1
+            yield self.stack[index]
+        for branch in reversed(self.branches[: branch_index + 1]):
+            yield from branch._iter_reversed()
+
+    async def rollback_async(self, partition: Hashable | None = None) -> None:
         """
         Run all the 'rollback_func' functions and mark them as 'cls.rolled_back' to True.
 
+        Calls are rolled back in reverse order. Branches are rolled back concurrently with each other, keeping
+        reverse order within each branch.  Calls that are already rolled back are skipped, so an interrupted or
+        imported rollback can be resumed.  Markers (see 'RecordPolicy') are skipped as well.
+
+        Args:
+            partition: Hashable | None
+                Only roll back the calls of this partition, in reverse recording order, leaving the other calls
+                to continue.  Takes time proportional to the number of calls in the partition.
+
+        Returns:
+            None
+        """
+        await self._rollback_async(None, partition)
+
+    async def rollback_iter(self, partition: Hashable | None = None) -> AsyncIterator[RollbackResult]:
+        """
+        Roll back like 'rollback_async', yielding a RollbackResult for every call as soon as its rollback finishes,
+        also for calls of branches rolled back concurrently.
+
+        The rollback runs in a separate task and does not wait for the loop body, so results are queued while
+        the caller handles earlier ones.
+
+        A failed rollback is yielded as a result with 'success' False instead of being raised.  Like
+        'rollback_async', the rollback stops after a failure on the stack, once running branches have finished.
+        Leaving the loop early cancels the rest of the rollback, which can be resumed later.
+
+        Args:
+            partition: Hashable | None
+                Only roll back the calls of this partition, see 'rollback_async'
+
+        Returns:
+            AsyncIterator[RollbackResult]
+        """
+        import asyncio
+
+        queue: asyncio.Queue[RollbackResult | None] = asyncio.Queue()
+        failed = False
+
+        async def run() -> None:
+            try:
+                await self._rollback_async(queue.put_nowait, partition)
+            finally:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(run())
+        try:
+            while (result := await queue.get()) is not None:
+                failed = failed or not result.success
+                yield result
+            try:
+                await task
+            except Exception:
+                # Already yielded as a failed result
+                if not failed:
+                    raise
+        finally:
+            if not task.done():
+                task.cancel()
+                with contextlib.suppress(BaseException):
+                    await task
+
+    async def _rollback_async(
+        self, on_result: Callable[[RollbackResult], None] | None, partition: Hashable | None = None
+    ) -> None:
+        """
+        Rollback engine of 'rollback_async' and 'rollback_iter'
+
+        Args:
+            on_result: Callable | None
+                Called with a RollbackResult after every call rollback
+            partition: Hashable | None
+                Only roll back the calls of this partition
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        self._drop_commits(partition)
+        try:
+            if partition is not None:
+                for call in reversed(self.partition_calls(partition)):
+                    await self._rollback_call(call, on_result)
+                return
+
+            pending = list(self.branches)
+            for index in range(len(self.stack), -1, -1):
+                group: list[TransactionState] = []
+                while pending and pending[-1]._branch_offset >= index:
+                    group.append(pending.pop())
+                if group:
+                    await self._rollback_branches(group, on_result)
+                if index:
+                    await self._rollback_call(self.stack[index - 1], on_result)
+        finally:
+            if self._root is self:
+                self.stats.rollback_duration += time.perf_counter() - start
+
+    async def _rollback_call(self, call: FunctionCall, on_result: Callable[[RollbackResult], None] | None) -> None:
+        """
+        Roll back one call, unless it is already rolled back or a marker
+
+        Args:
+            call: FunctionCall
+            on_result: Callable | None
+                Called with the RollbackResult
+
+        Returns:
+            None
+        """
+        if call.rolled_back or call.marker:
+            return
+        limit = self._rollback_limit.get()
+        start = time.perf_counter()
+        try:
+            if limit is None:
+                await call.rollback()
+            else:
+                async with limit:
+                    await call.rollback()
+        finally:
+            call.rollback_duration = time.perf_counter() - start
+            call.rolled_back_at = time.time()
+            self.stats.record_rollback(call.rolled_back)
+            self._changed(call)
+            if on_result is not None:
+                on_result(
+                    RollbackResult(
+                        call=call,
+                        success=call.rolled_back,
+                        duration=call.rollback_duration,
+                        error=None if call.rolled_back else call.exception,
+                    )
+                )
+
+    @staticmethod
+    async def _rollback_branches(
+        branches: list["TransactionState"], on_result: Callable[[RollbackResult], None] | None
+    ) -> None:
+        """
+        Roll back branches concurrently, raising the first failure once every branch has finished.
+
+        Args:
+            branches: list[TransactionState]
+                Branches created at the same point of the parent stack.
+            on_result: Callable | None
+                Passed on to the rollback of every branch
+
+        Returns:
+            None
+        """
+        if len(branches) == 1:
+            await branches[0]._rollback_async(on_result)
+            return
+
+        import asyncio
+
+        results = await asyncio.gather(
+            *(branch._rollback_async(on_result) for branch in branches), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def commit_async(self) -> None:
+        """
+        Run the queued prepare functions, then the queued commit functions, each called once per decorated
+        function with the list of its queued calls, in the order the functions were first called.
+
+        A prepare function that raises an exception, or returns False, vetoes the commit: no commit function is
+        run, the state is rolled back and the exception is raised.  A failing commit function does not stop the
+        other commit functions, the first failure is raised once they have finished.
+
         Returns:
             None
         """
+        root = self._root
+        queue, root._commit_queue = root._commit_queue, {}
+        prepares = [(prepare, calls) for (prepare, _), calls in queue.items() if prepare is not None]
+        commits = [(commit, calls) for (_, commit), calls in queue.items() if commit is not None]
+        try:
+            await self._run_commit_handlers(prepares, veto=True)
+        except Exception:
+            await self.rollback_async()
+            raise
+        try:
+            await self._run_commit_handlers(commits, veto=False)
+        except Exception:
+            root._commit_failed = True
+            raise
+
+    async def _run_commit_handlers(
+        self, handlers: list[tuple[Callable[..., Any], list[FunctionCall]]], veto: bool
+    ) -> None:
+        """
+        Call every handler with its calls, concurrently when 'self.concurrent_commit' is set
+
+        Args:
+            handlers: list of (handler, calls) tuples
+            veto: bool
+                Stop at the first failure, and treat a False return value as a failure
 
-        for call in reversed(self.stack):
-            await call.rollback()
+        Returns:
+            None
+        """
+        import inspect
+
+        async def run(handler: Callable[..., Any], calls: list[FunctionCall]) -> None:
+            result = handler(calls)
+            if inspect.isawaitable(result):
+                result = await result
+            if veto and result is False:
+                raise RuntimeError(f"Commit vetoed by {handler.__qualname__}")
+
+        if self._root.concurrent_commit and len(handlers) > 1:
+            import asyncio
+
+            results = await asyncio.gather(*(run(*handler) for handler in handlers), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+        else:
+            errors = []
+            for handler in handlers:
+                try:
+                    await run(*handler)
+                except Exception as e:
+                    if veto:
+                        raise
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def commit(self) -> None:
+        """
+        Synchronously run 'commit_async', see 'rollback' for how the event loop is managed.
+
+        Returns:
+            None
+        """
+        if self._root._commit_queue:
+            self._run_sync(self.commit_async)
 
     def clear(self) -> None:
         self.stack.clear()
+        self.branches.clear()
+        if self._root is self:
+            self._commit_queue.clear()
+            self._partitions.clear()
+            self.stats.reset_calls()
 
-    def rollback(self) -> None:
+    def rollback(self, partition: Hashable | None = None) -> None:
         """
-        Synchronously execute all rollback functions.
+        Synchronously execute all rollback functions, or those of 'partition', see 'rollback_async'.
 
         This helper manages the event loop. If an event loop is already
         running, the rollback coroutine is executed in a separate thread to
@@ -160,8 +747,22 @@ class TransactionState:
             None
         """
 
-        async def _run() -> None:
-            await self.rollback_async()
+        self._run_sync(functools.partial(self.rollback_async, partition))
+
+    @staticmethod
+    def _run_sync(func: Callable[[], Coroutine[Any, Any, None]]) -> None:
+        """
+        Run the coroutine returned by 'func' to completion, in a separate thread if an event loop is running
+
+        Args:
+            func: Callable
+                Coroutine function without arguments
+
+        Returns:
+            None
+        """
+        import asyncio
+        import threading
 
         try:
             loop = asyncio.get_running_loop()
@@ -173,7 +774,7 @@ class TransactionState:
 
             def runner() -> None:
                 try:
-                    asyncio.run(_run())
+                    asyncio.run(func())
                 except BaseException as e:  # noqa: BLE001
                     exc.append(e)
 
@@ -184,7 +785,7 @@ class TransactionState:
                 raise exc[0]
         else:
             try:
-                loop.run_until_complete(loop.create_task(_run()))
+                loop.run_until_complete(loop.create_task(func()))
             finally:
                 if loop is not None:
                     loop.close()
@@ -196,26 +797,217 @@ class TransactionState:
         Returns: str
             JSON String representation of TransactionState and function call history
         """
-        data = [call.to_dict() for call in self.stack]
+        import json
+
+        data = [call.to_dict() for call in self.iter_calls()]
         return json.dumps(data, indent=4)
 
     @classmethod
-    def import_history(cls, json_str: str) -> "TransactionState":
+    def import_history(cls, json_str: str, resume: bool = False) -> "TransactionState":
         """
         Convert json_str back to a functioning TransactionState
 
         Args:
             json_str: str
                 JSON String (created by cls.export_history)
+            resume: bool
+                Return the results of completed calls instead of running them again, see 'take_completed'
 
         Returns:
             TransactionState
         """
-        transaction_state = cls()
+        import json
+
+        transaction_state = cls(resume=resume)
         transaction_state.stack.clear()
-        transaction_state.stack.extend([FunctionCall.from_dict(item) for item in json.loads(json_str)])
+        for item in json.loads(json_str):
+            transaction_state.record_call(FunctionCall.from_dict(item))
+        return transaction_state
+
+    def export_compressed(self, codec: str = "zlib", level: int = 6) -> bytes:
+        """
+        Export stack history as compressed bytes, with 'name' and 'rollback_func' strings interned
+
+        Args:
+            codec: str
+                "zlib" or "lzma"
+            level: int
+                Compression level (zlib 0-9, lzma preset 0-9)
+
+        Returns: bytes
+            Compressed representation of the function call history
+        """
+        from transaction.classes.compressed_history import CompressedHistory
+
+        return CompressedHistory.encode(self.iter_calls(), codec=codec, level=level)
+
+    @classmethod
+    def import_compressed(cls, data: bytes | BinaryIO, resume: bool = False) -> "TransactionState":
+        """
+        Convert compressed history back to a functioning TransactionState, decompressing it as a stream
+
+        Args:
+            data: bytes | BinaryIO
+                Bytes created by cls.export_compressed, or a binary file opened for reading
+            resume: bool
+                Return the results of completed calls instead of running them again, see 'take_completed'
+
+        Returns:
+            TransactionState
+        """
+        from transaction.classes.compressed_history import CompressedHistory
+
+        transaction_state = cls(resume=resume)
+        for call in CompressedHistory.decode(data):
+            transaction_state.record_call(call)
         return transaction_state
 
+    def export_columnar(self, directory: str) -> int:
+        """
+        Export call history as typed binary columns for analytics, see 'ColumnarHistory'
+
+        Args:
+            directory: str
+                Directory the columns are written to
+
+        Returns: int
+            Number of calls written
+        """
+        from transaction.classes.columnar_history import ColumnarHistory
+
+        return ColumnarHistory.from_states([self]).write(directory)
+
+    def export_history_file(self, path: str) -> int:
+        """
+        Export stack history to a history file, which can be opened with 'open_history_file' without
+        loading it into memory.
+
+        Args:
+            path: str
+                Path of the file to write
+
+        Returns: int
+            Number of calls written
+        """
+        from transaction.classes.history_file import HistoryFile
+
+        return HistoryFile.write(path, self.iter_calls())
+
+    @classmethod
+    def open_history_file(cls, path: str, reraise: bool = True) -> "MappedTransactionState":
+        """
+        Open a history file (created by cls.export_history_file) as a read-only TransactionState.
+        Calls are read from a memory map when accessed.  Call 'close()' when done.
+
+        Args:
+            path: str
+                Path of the history file
+            reraise: bool
+                Should an exception be raised after rollback
+
+        Returns:
+            MappedTransactionState
+        """
+        from transaction.classes.history_file import HistoryFile
+        from transaction.classes.history_file import MappedTransactionState
+
+        return MappedTransactionState(HistoryFile(path), reraise=reraise)
+
+    @property
+    def export_cursor(self) -> int:
+        """
+        Cursor of the last 'export_delta()' call
+
+        Returns:
+            int
+        """
+        return self._root._export_cursor
+
+    def export_delta(self, since: int | None = None) -> str:
+        """
+        Export the calls recorded, and the status changes made, since 'since' as a JSON string.
+        The first export starts tracking changes, and includes every call recorded so far.
+
+        Changes older than 'since' are forgotten, so the tracked changes only cover the last two exports.  Only
+        'since' itself and later cursors can be exported again, such as the previous cursor to retry a delta
+        that was lost.
+
+        Args:
+            since: int | None
+                Cursor returned in a previous delta.  Defaults to 'self.export_cursor'.
+
+        Returns: str
+            JSON String with the new 'cursor', new 'records' and status 'updates', for 'apply_delta()'
+        """
+        import json
+
+        root = self._root
+        if root._journal is None:
+            root._journal = [(True, call) for call in root.iter_calls()]
+        if since is None:
+            since = root._export_cursor
+        if not root._journal_start <= since <= root._journal_start + len(root._journal):
+            raise ValueError(f"Invalid cursor: {since}")
+        del root._journal[: since - root._journal_start]
+        root._journal_start = since
+
+        records: dict[int, FunctionCall] = {}
+        updates: dict[int, FunctionCall] = {}
+        for is_new, call in root._journal:
+            if is_new:
+                records[id(call)] = call
+            elif id(call) not in records:
+                updates[id(call)] = call
+
+        root._export_cursor = since + len(root._journal)
+        data = {
+            "cursor": root._export_cursor,
+            "records": [{"seq": call.seq, **call.to_dict()} for call in sorted(records.values(), key=_seq)],
+            "updates": [{"seq": call.seq, **call.status()} for call in updates.values()],
+        }
+        return json.dumps(data)
+
+    def apply_delta(self, delta: str) -> None:
+        """
+        Apply a JSON string created by 'export_delta()', appending new calls and updating the status of
+        known calls.
+
+        Args:
+            delta: str
+                JSON String (created by export_delta)
+
+        Returns:
+            None
+        """
+        import json
+
+        data = json.loads(delta)
+        for item in data["records"]:
+            call = FunctionCall.from_dict(item)
+            call.seq = item["seq"]
+            self.record_call(call)
+        for item in data["updates"]:
+            call = self._find_seq(item["seq"])
+            call.apply_status(item)
+            self._changed(call)
+
+    def _find_seq(self, seq: int) -> FunctionCall:
+        """
+        Find a call by sequence number in a stack built by 'apply_delta()', which is ordered by sequence number
+
+        Args:
+            seq: int
+
+        Returns:
+            FunctionCall
+        """
+        import bisect
+
+        index = bisect.bisect_left(self.stack, seq, key=_seq)
+        if index == len(self.stack) or self.stack[index].seq != seq:
+            raise KeyError(f"No call with sequence number {seq}")
+        return self.stack[index]
+
     @classmethod
     def get_current(cls) -> Optional["TransactionState"]:
         """
@@ -225,3 +1017,23 @@ class TransactionState:
 
         """
         return cls._current_state.get()
+
+
+def _resume_key(
+    name: str, key: Hashable | None, args: tuple[Any, ...], kwargs: dict[str, Any], instance_key: Hashable | None
+) -> tuple[str, str]:
+    """
+    Lookup key of 'take_completed'.  Values are compared in JSON form, so a call matches its imported copy.
+
+    Returns:
+        tuple[str, str]
+    """
+    import json
+
+    if key is not None:
+        return name, json.dumps(["key", instance_key, key], sort_keys=True, default=repr)
+    return name, json.dumps(["args", instance_key, args, kwargs], sort_keys=True, default=repr)
+
+
+def _seq(call: FunctionCall) -> int:
+    return call.seq if call.seq is not None else -1
@@ -0,0 +1,103 @@
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+
+from transaction.classes.function_call import FunctionCall
+
+
+@dataclass
+class TransactionStats:
+    """
+    Class to represent statistics of a TransactionState, updated as calls are recorded and rolled back.
+    A state and its branches share one TransactionStats.
+
+    'retained_bytes' is an estimate: the shallow size of the args and kwargs containers and of their items,
+    taken when the call is recorded.
+    """
+
+    calls: int = 0
+    calls_by_function: Counter[str] = field(default_factory=Counter)
+    retained_bytes: int = 0
+    started_at: float | None = None
+    finished_at: float | None = None
+    rolled_back: int = 0
+    rollback_failed: int = 0
+    rollback_duration: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds since the state was entered, until it was exited
+
+        Returns:
+            float
+        """
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def record(self, call: FunctionCall) -> None:
+        """
+        Count a recorded call
+
+        Args:
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        self.calls += 1
+        self.calls_by_function[call.name] += 1
+        self.retained_bytes += _estimate_size(call.args) + _estimate_size(call.kwargs)
+
+    def record_rollback(self, success: bool) -> None:
+        """
+        Count the outcome of a call rollback
+
+        Args:
+            success: bool
+
+        Returns:
+            None
+        """
+        if success:
+            self.rolled_back += 1
+        else:
+            self.rollback_failed += 1
+
+    def reset_calls(self) -> None:
+        """
+        Forget recorded calls, used when the stack is cleared
+
+        Returns:
+            None
+        """
+        self.calls = 0
+        self.calls_by_function.clear()
+        self.retained_bytes = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns dict version of data in 'self'
+
+        Returns:
+            dict[str, Any]
+        """
+        return {
+            "calls": self.calls,
+            "calls_by_function": dict(self.calls_by_function),
+            "retained_bytes": self.retained_bytes,
+            "elapsed": self.elapsed,
+            "rolled_back": self.rolled_back,
+            "rollback_failed": self.rollback_failed,
+            "rollback_duration": self.rollback_duration,
+        }
+
+
+def _estimate_size(container: tuple[Any, ...] | dict[str, Any]) -> int:
+    values = container.values() if isinstance(container, dict) else container
+    return sys.getsizeof(container) + sum(sys.getsizeof(value) for value in values)
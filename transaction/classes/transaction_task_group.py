@@ -0,0 +1,122 @@
+from collections.abc import Coroutine
+from types import TracebackType
+from typing import Any
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from transaction.classes.transaction_state import TransactionState
+
+
+T = TypeVar("T")
+
+
+class TransactionTaskGroup:
+    """
+    Class to run child tasks inside a TransactionState, where every task records its calls on its own branch
+    of the parent state.
+    """
+
+    def __init__(self, state: "TransactionState", cancel_on_error: bool = True) -> None:
+        """
+        Initialize TransactionTaskGroup
+
+        Args:
+            state: TransactionState
+                Parent state the branches are created on.
+            cancel_on_error: bool
+                Cancel in-flight sibling tasks as soon as one task fails.
+                When False, all tasks are awaited before the failures are raised.
+        """
+        self.state = state
+        self._cancel_on_error = cancel_on_error
+        self._task_group: asyncio.TaskGroup | None = None
+        self._tasks: list[asyncio.Task[Any]] = []
+
+    async def __aenter__(self) -> "TransactionTaskGroup":
+        """
+        Async Context Manager start
+
+        Returns:
+            TransactionTaskGroup
+        """
+        import asyncio
+
+        if self._cancel_on_error:
+            self._task_group = asyncio.TaskGroup()
+            await self._task_group.__aenter__()
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
+    ) -> bool:
+        """
+        Async Context Manager end.  Waits for all child tasks.
+
+        Args:
+            exc_type:
+                If exception is thrown, this is the type of exception.
+            exc_val:
+                If exception is thrown, this is the value of exception.
+            exc_tb:
+                If exception is thrown, this it the traceback of exception.
+
+        Returns:
+            bool
+                Always False, exceptions are never suppressed.
+        """
+        if self._task_group is not None:
+            await self._task_group.__aexit__(exc_type, exc_val, exc_tb)
+            return False
+
+        import asyncio
+
+        if exc_type:
+            for task in self._tasks:
+                task.cancel()
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and not exc_type:
+            raise ExceptionGroup("unhandled errors in a TransactionTaskGroup", errors)
+        return False
+
+    def create_task(self, coro: Coroutine[Any, Any, T], *, name: str | None = None) -> "asyncio.Task[T]":
+        """
+        Schedule 'coro' as a child task recording onto a new branch of 'self.state'.
+
+        Args:
+            coro: Coroutine
+                Coroutine to run, usually a call to a '@transaction' decorated async function.
+            name: str | None
+                Optional name of the task.
+
+        Returns:
+            asyncio.Task
+        """
+        import asyncio
+
+        branch = self.state.branch()
+        if self._task_group is not None:
+            return self._task_group.create_task(self._run(branch, coro), name=name)
+
+        task = asyncio.get_running_loop().create_task(self._run(branch, coro), name=name)
+        self._tasks.append(task)
+        return task
+
+    @staticmethod
+    async def _run(branch: "TransactionState", coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Make 'branch' the current state of the task, then run 'coro'.
+        Each task runs in its own copy of the context, so the parent state is left untouched.
+
+        Args:
+            branch: TransactionState
+            coro: Coroutine
+
+        Returns:
+            Result of 'coro'
+        """
+        branch._current_state.set(branch)
+        return await coro
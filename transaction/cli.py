@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import json
+import sys
+import time
+from collections.abc import Iterator
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from transaction.classes.recovery_report import RecoveryOutcome
+from transaction.recovery import recover_histories
+
+DIRECTORY_PATTERNS = ("*.json", "*.txnz")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """
+    Entry point of 'transaction-recover'.
+
+    Replays the pending rollbacks of exported histories stored in a directory ('export_history()' as '*.json',
+    'export_compressed()' as '*.txnz') or in a SQLite table.  The outcome of every history is written to a checkpoint
+    file as soon as it is handled, so an interrupted run resumes where it stopped.  For a history that failed, the checkpoint also holds the
+    calls that were rolled back, and '--retry-failed' does not roll those back again.
+
+    Args:
+        argv: Sequence[str] | None
+            Command line arguments, defaults to 'sys.argv[1:]'
+
+    Returns:
+        int
+            Exit code, 1 if any history failed to roll back
+    """
+    parser = argparse.ArgumentParser(
+        prog="transaction-recover", description="Roll back pending exported transaction histories."
+    )
+    parser.add_argument("source", help="Directory of exported histories, or SQLite database with --sqlite")
+    parser.add_argument("--sqlite", action="store_true", help="Read histories from a SQLite database")
+    parser.add_argument("--table", default="histories", help="SQLite table with 'id' and 'history' columns")
+    parser.add_argument("--concurrency", type=int, default=100, help="Histories rolled back at the same time")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Histories decoded per batch")
+    parser.add_argument("--processes", type=int, default=None, help="Decoding processes, 0 decodes in-process")
+    parser.add_argument("--checkpoint", help="Checkpoint file, defaults to '<source>.checkpoint'")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry histories that failed in earlier runs")
+    args = parser.parse_args(argv)
+
+    checkpoint = Path(args.checkpoint or f"{str(args.source).rstrip('/')}.checkpoint")
+    done, progress = _read_checkpoint(checkpoint, args.retry_failed)
+    if args.sqlite:
+        source = _sqlite_histories(args.source, args.table, done)
+    else:
+        source = _directory_histories(Path(args.source), done)
+
+    start = time.perf_counter()
+    succeeded = failed = calls = 0
+    # Ids of the histories read but not handled yet, by input position
+    ids: dict[int, str] = {}
+
+    def read() -> Iterator[str | bytes]:
+        for index, (history_id, history) in enumerate(_with_progress(source, progress)):
+            ids[index] = history_id
+            yield history
+
+    def write(outcome: RecoveryOutcome) -> None:
+        nonlocal succeeded, failed, calls
+        history_id = ids.pop(outcome.index)
+        entry = {"id": history_id, "success": outcome.success, "error": outcome.error}
+        if not outcome.success:
+            entry["rolled_back"] = outcome.rolled_back_seqs
+        f.write(json.dumps(entry))
+        f.write("\n")
+        f.flush()
+        succeeded += outcome.success
+        failed += not outcome.success
+        calls += outcome.rolled_back
+        if outcome.error:
+            print(f"{history_id}: {outcome.error}", file=sys.stderr)
+
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(checkpoint.open("a"))
+        executor = None if args.processes == 0 else stack.enter_context(ProcessPoolExecutor(args.processes))
+        if f.tell() and not checkpoint.read_bytes().endswith(b"\n"):
+            # Start after the partial line of an interrupted write
+            f.write("\n")
+        recover_histories(
+            read(),
+            processes=args.processes,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            executor=executor,
+            on_outcome=write,
+        )
+
+    elapsed = time.perf_counter() - start
+    total = succeeded + failed
+    print(
+        f"Recovered {total} histories in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f}/s): "
+        f"{succeeded} succeeded, {failed} failed, {len(done)} skipped, {calls} calls rolled back"
+    )
+    return 1 if failed else 0
+
+
+def _read_checkpoint(path: Path, retry_failed: bool) -> tuple[set[str], dict[str, list[int]]]:
+    """
+    Ids of histories handled by earlier runs, and the calls already rolled back of histories that failed
+
+    Args:
+        path: Path
+        retry_failed: bool
+            Leave out histories that failed, so they are tried again
+
+    Returns:
+        tuple[set[str], dict[str, list[int]]]
+            Ids to skip, and per failed history the positions of its rolled back calls
+    """
+    done: set[str] = set()
+    progress: dict[str, list[int]] = {}
+    if not path.exists():
+        return done, progress
+    with path.open() as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Last line of an interrupted write
+                continue
+            if entry["success"] or not retry_failed:
+                done.add(entry["id"])
+            else:
+                done.discard(entry["id"])
+                progress[entry["id"]] = entry.get("rolled_back", [])
+    return done, progress
+
+
+def _with_progress(
+    histories: Iterator[tuple[str, str | bytes]], progress: dict[str, list[int]]
+) -> Iterator[tuple[str, str | bytes]]:
+    """
+    Mark the calls rolled back by earlier runs as rolled back, so they are skipped
+
+    Args:
+        histories: Iterator[tuple[str, str | bytes]]
+        progress: dict[str, list[int]]
+            Positions of the rolled back calls per history id
+
+    Returns:
+        Iterator[tuple[str, str | bytes]]
+    """
+    for history_id, history in histories:
+        if progress.get(history_id):
+            history = _mark_rolled_back(history, progress[history_id])
+        yield history_id, history
+
+
+def _mark_rolled_back(history: str | bytes, positions: list[int]) -> str | bytes:
+    """
+    JSON history with the calls at 'positions' marked as rolled back
+
+    Args:
+        history: str | bytes
+            History created by 'export_history' or 'export_compressed'
+        positions: list[int]
+
+    Returns:
+        str | bytes
+            The history as it was if it can not be decoded, recovery then reports the error
+    """
+    from transaction.classes.compressed_history import CompressedHistory
+
+    try:
+        if isinstance(history, bytes):
+            items = [call.to_dict() for call in CompressedHistory.decode(history)]
+        else:
+            items = json.loads(history)
+        for position in positions:
+            items[position]["rolled_back"] = True
+        return json.dumps(items)
+    except Exception:  # noqa: BLE001
+        return history
+
+
+def _directory_histories(directory: Path, done: set[str]) -> Iterator[tuple[str, str | bytes]]:
+    paths = sorted(path for pattern in DIRECTORY_PATTERNS for path in directory.glob(pattern))
+    for path in paths:
+        if path.name in done:
+            continue
+        if path.suffix == ".txnz":
+            yield path.name, path.read_bytes()
+        else:
+            yield path.name, path.read_text()
+
+
+def _sqlite_histories(database: str, table: str, done: set[str]) -> Iterator[tuple[str, str | bytes]]:
+    import sqlite3
+
+    if not table.isidentifier():
+        raise ValueError(f"Invalid table name: {table}")
+    connection = sqlite3.connect(database)
+    try:
+        for history_id, history in connection.execute(f"SELECT id, history FROM {table} ORDER BY id"):  # noqa: S608
+            if str(history_id) not in done:
+                yield str(history_id), history
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
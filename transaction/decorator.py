@@ -1,50 +1,84 @@
 import functools
 import inspect
+import types
+import weakref
+from collections.abc import AsyncIterator
 from collections.abc import Awaitable
 from collections.abc import Callable
+from collections.abc import Hashable
+from collections.abc import Iterator
 from typing import Any
 from typing import cast
+from typing import overload
 from typing import ParamSpec
 from typing import ParamSpecKwargs
 from typing import TypeVar
 
 from transaction.classes.function_call import FunctionCall
+from transaction.classes.partial_batch_error import PartialBatchError
 from transaction.classes.transaction_state import TransactionState
 from transaction.helpers import FunctionType
 from transaction.helpers import get_class
 from transaction.helpers import inspect_function
-
+from transaction.helpers import RecordPolicy
 
 T = TypeVar("T")
 P = ParamSpec("P")
 
 
 class StaticTransactionMethod(staticmethod):  # type: ignore[type-arg]
-    def __init__(self, wrapped: Callable):  # type: ignore[type-arg]
-        self._wrapper = TransactionWrapper(wrapped)
+    def __init__(self, wrapped: Callable, **options: Any):  # type: ignore[type-arg]
+        self._wrapper = TransactionWrapper(wrapped, **options)
         super().__init__(self._wrapper)
 
     def rollback(self, rollback_func: Callable) -> Callable:  # type: ignore[type-arg]
         return self._wrapper.rollback(rollback_func)
 
+    def commit(self, commit_func: Callable) -> Callable:  # type: ignore[type-arg]
+        return self._wrapper.commit(commit_func)
+
+    def prepare(self, prepare_func: Callable) -> Callable:  # type: ignore[type-arg]
+        return self._wrapper.prepare(prepare_func)
+
 
 class ClassTransactionMethod(classmethod):  # type: ignore[type-arg]
-    def __init__(self, wrapped: Callable):  # type: ignore[type-arg]
-        self._wrapper = TransactionWrapper(wrapped)
+    def __init__(self, wrapped: Callable, **options: Any):  # type: ignore[type-arg]
+        self._wrapper = TransactionWrapper(wrapped, **options)
         super().__init__(self._wrapper)  # type: ignore[arg-type]
 
     def rollback(self, rollback_func: Callable) -> Callable:  # type: ignore[type-arg]
         return self._wrapper.rollback(rollback_func)
 
+    def commit(self, commit_func: Callable) -> Callable:  # type: ignore[type-arg]
+        return self._wrapper.commit(commit_func)
+
+    def prepare(self, prepare_func: Callable) -> Callable:  # type: ignore[type-arg]
+        return self._wrapper.prepare(prepare_func)
+
+
+@overload
+def transaction(func: Callable[P, T]) -> Callable[P, T | Awaitable[T]]: ...
+
+
+@overload
+def transaction(func: None = None, **options: Any) -> Callable[[Callable[P, T]], Callable[P, T | Awaitable[T]]]: ...
+
 
-def transaction(func: Callable[P, T]) -> Callable[P, T | Awaitable[T]]:
+def transaction(
+    func: Callable[P, T] | None = None, **options: Any
+) -> Callable[P, T | Awaitable[T]] | Callable[[Callable[P, T]], Callable[P, T | Awaitable[T]]]:
     """
-    Decorator used to define initial functions
+    Decorator used to define initial functions.
+    Can be used bare ('@transaction') or with options ('@transaction(items_per_call=100)').
+
     Args:
         func: callable/awaitable function
+        **options: Keyword options passed to TransactionWrapper
 
     Returns: callable/awaitable function
     """
+    if func is None:
+        return functools.partial(transaction, **options)
 
     func_type = inspect_function(func)
 
@@ -52,18 +86,18 @@ def transaction(func: Callable[P, T]) -> Callable[P, T | Awaitable[T]]:
         if func_type == FunctionType.STATIC_METHOD:
             if isinstance(func, staticmethod):
                 raise TypeError("@transaction must be applied before @staticmethod")
-            return StaticTransactionMethod(func)
+            return StaticTransactionMethod(func, **options)
         elif func_type == FunctionType.CLASS_METHOD:
             if isinstance(func, classmethod):
                 raise TypeError("@transaction must be applied before @classmethod")
-            return ClassTransactionMethod(func)  # type: ignore[return-value]
+            return ClassTransactionMethod(func, **options)  # type: ignore[return-value]
         if not func_type.is_not_supported():
             raise ValueError(f"UNSUPPORTED TYPE: {func_type}")
         raise ValueError(f"UNKNOWN TYPE: {func_type}")
 
     # If standard function, then it falls down to here.
-    wrapper = TransactionWrapper(func)
-    return cast(Callable[P, T | Awaitable[T]], wrapper)
+    wrapper = TransactionWrapper(func, **options)
+    return cast("Callable[P, T | Awaitable[T]]", wrapper)
 
 
 class TransactionWrapper:
@@ -71,12 +105,93 @@ class TransactionWrapper:
     Class to help decorator with defining the rollback_func rollback function and if it is a coroutine or not
     """
 
-    def __init__(self, func: Callable[P, T]) -> None:
+    def __init__(
+        self,
+        func: Callable[P, T],
+        *,
+        items_per_call: int = 1,
+        instance_key: Callable[[Any], Any] | None = None,
+        record_policy: RecordPolicy | str | None = None,
+        batch: bool = False,
+        capture_result: bool | Callable[[Any], Any] = False,
+        partition: Callable[..., Hashable] | None = None,
+        idempotency_key: Callable[..., Hashable] | None = None,
+    ) -> None:
+        """
+        Initialize TransactionWrapper
+
+        Args:
+            func: Decorated function
+            items_per_call: int
+                Generator and async generator functions only.  Number of yielded items recorded together as
+                one FunctionCall.
+            instance_key: Callable | None
+                Instance methods only.  Function returning an identity key for 'self'.  When set, the recorded
+                call holds the key instead of a weak reference to the instance, and the rollback function
+                receives the key in place of 'self'.
+            record_policy: RecordPolicy | str | None
+                How calls are recorded while no rollback function is defined.  Defaults to the
+                'record_policy' of the current TransactionState.
+            batch: bool
+                Batch step.  The function takes a sequence of items as its first argument, and is recorded as one
+                FunctionCall holding the sequence.  If it raises PartialBatchError, the recorded sequence is
+                narrowed to the processed items, so the rollback function receives only those.
+            capture_result: bool | Callable
+                Store the return value (awaited for coroutine functions) in the recorded call, or the part of it
+                returned by this function, and pass it to the rollback function as the 'result' keyword argument.
+                Calls that raised have no result, and their rollback function is called without it.  Only calls
+                with a captured result are resumed from a completed call, and return the whole return value: with
+                a function, the return value is stored next to the part it returns.
+            partition: Callable | None
+                Function called with the arguments of the call (including 'self' for instance methods), returning
+                the partition key of the recorded call.  Defaults to the key of 'TransactionState.partition()'.
+            idempotency_key: Callable | None
+                Function called with the arguments of the call, returning a key identifying the call in a resumed
+                transaction.  Defaults to matching the name, args and kwargs of the call.
+        """
+        if items_per_call < 1:
+            raise ValueError("items_per_call must be at least 1")
         self.func = func
         self.rollback_func: Callable[..., Any] | None = None
+        self.commit_func: Callable[..., Any] | None = None
+        self.prepare_func: Callable[..., Any] | None = None
         self._is_coroutine = inspect.iscoroutinefunction(func)
+        self._is_generator = inspect.isgeneratorfunction(func)
+        self._is_async_generator = inspect.isasyncgenfunction(func)
+        self._items_per_call = items_per_call
+        self._instance_key = instance_key
+        self._record_policy = RecordPolicy(record_policy) if record_policy is not None else None
+        self._batch = batch
+        self._capture_result = capture_result
+        self._partition = partition
+        self._idempotency_key = idempotency_key
+        if batch and (self._is_generator or self._is_async_generator):
+            raise ValueError("batch can not be used with generator functions, use items_per_call instead")
+        if capture_result and (self._is_generator or self._is_async_generator):
+            raise ValueError("capture_result can not be used with generator functions")
+        self._func_type: FunctionType | None = None
         functools.update_wrapper(self, func)  # type: ignore[arg-type]
 
+    def __get__(
+        self, instance: Any, owner: type | None = None
+    ) -> "TransactionWrapper | BoundTransactionMethod | types.MethodType":
+        """
+        Descriptor support, so a decorated function defined in a class body works as an instance method
+
+        Args:
+            instance: Instance the function is accessed through, or None when accessed through the class
+            owner: Class the function is defined on
+
+        Returns:
+            TransactionWrapper when accessed through the class, BoundTransactionMethod otherwise
+        """
+        if instance is None:
+            return self
+        if isinstance(instance, type):
+            # 'classmethod' binds the class through '__get__' before Python 3.13, keep it in the args like 3.13 does
+            return types.MethodType(self, instance)
+        return BoundTransactionMethod(self, instance)
+
     def rollback(self, func: Callable[..., Any]) -> Callable[..., Any]:
         """
         Define rollback function for FunctionCall
@@ -90,6 +205,35 @@ class TransactionWrapper:
         self.rollback_func = func
         return func
 
+    def commit(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Define commit function, run once the TransactionState exits without an exception.
+        Calls are queued during the transaction and the commit function is called once, with the list of
+        queued FunctionCalls.
+
+        Args:
+            func: Commit function
+
+        Returns:
+            Inputted callable function
+        """
+        self.commit_func = func
+        return func
+
+    def prepare(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Define prepare function, run with the list of queued FunctionCalls before any commit function.
+        Raising an exception, or returning False, vetoes the commit and rolls back the TransactionState.
+
+        Args:
+            func: Prepare function
+
+        Returns:
+            Inputted callable function
+        """
+        self.prepare_func = func
+        return func
+
     def __call__(self, *args: ParamSpec, **kwargs: ParamSpecKwargs) -> T | Awaitable[T]:
         """
         Catch all calls not defined previously
@@ -103,31 +247,357 @@ class TransactionWrapper:
             Callable or Awaitable function
 
         """
+        return self._call(None, args, kwargs)
+
+    def _call(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> T | Awaitable[T]:
+        """
+        Record and call the wrapped function.
+
+        Coroutine functions are recorded when the coroutine starts running, so the call lands on the
+        TransactionState that is current inside the task awaiting it.
+
+        Generator and async generator functions are recorded as their items are consumed, see '_iter_sync'.
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Callable or Awaitable function
+        """
+        if self._batch and not args:
+            raise TypeError(f"Batch step {self.func.__qualname__} takes a sequence of items as its first argument")
+        if self._is_coroutine:
+            return self._call_async(instance, args, kwargs)
+        if self._is_generator:
+            return self._iter_sync(instance, args, kwargs)  # type: ignore[return-value]
+        if self._is_async_generator:
+            return self._iter_async(instance, args, kwargs)  # type: ignore[return-value]
+
+        completed = self._resume(instance, args, kwargs)
+        if completed is not None:
+            return completed.resumed_result()  # type: ignore[no-any-return]
+        call = self._record(instance, args, kwargs)
+        try:
+            result = self._invoke(instance, args, kwargs)
+        except PartialBatchError as e:
+            if self._batch:
+                self._narrow_batch(call, args, e)
+            raise
+        if call is not None:
+            self._complete(call, result)
+        return result  # type: ignore[no-any-return]
+
+    async def _call_async(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> T:
+        """
+        Record and await a call to a coroutine function
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Result of the awaited function
+        """
+        completed = self._resume(instance, args, kwargs)
+        if completed is not None:
+            return completed.resumed_result()  # type: ignore[no-any-return]
+        call = self._record(instance, args, kwargs)
+        try:
+            result = self._invoke(instance, args, kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+        except PartialBatchError as e:
+            if self._batch:
+                self._narrow_batch(call, args, e)
+            raise
+        if call is not None:
+            self._complete(call, result)
+        return result  # type: ignore[no-any-return]
+
+    def _complete(self, call: FunctionCall, result: Any) -> None:
+        """
+        Mark the recorded call as completed, and store the result, or the part of it selected by
+        'capture_result', in it
+
+        Args:
+            call: FunctionCall
+                Recorded call
+            result: Return value of the wrapped function
+
+        Returns:
+            None
+        """
+        if call.marker:
+            return
+        call.completed = True
+        if self._capture_result:
+            extract = self._capture_result
+            if callable(extract):
+                call.result = extract(result)
+                # Resumed calls return the whole return value, not the extracted part
+                call.return_value = result
+                call.return_captured = True
+            else:
+                call.result = result
+            call.result_captured = True
+        state = TransactionState.get_current()
+        # Calls only queued for commit are not on the stack, so there is no change to export
+        if state and call.seq is not None:
+            state._changed(call)
+
+    def _resume(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> FunctionCall | None:
+        """
+        Completed imported call matching this call, when the current TransactionState resumes a transaction
+
+        Only calls with a captured return value are resumed, see 'capture_result'.  Bound method calls are only
+        resumed with an 'instance_key', as the instance of a weak reference can not be matched.
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            FunctionCall | None
+        """
+        state = TransactionState.get_current()
+        if state is None or not state._root.resume or not self._capture_result:
+            return None
+        instance_key = None
+        if instance is not None:
+            if self._instance_key is None:
+                return None
+            instance_key = self._instance_key(instance)
+        key = self._key(self._idempotency_key, instance, args, kwargs)
+        completed = state.take_completed(self.func.__qualname__, key, args, kwargs, instance_key)
+        if completed is None or not (
+            completed.return_captured or (completed.result_captured and not callable(self._capture_result))
+        ):
+            return None
+        return completed
+
+    def _narrow_batch(self, call: FunctionCall | None, args: tuple[Any, ...], error: PartialBatchError) -> None:
+        """
+        Narrow the items recorded for a failed batch step to the items it processed
+
+        Args:
+            call: FunctionCall | None
+                Recorded call, None if nothing was recorded
+            args: Arguments, the items first
+            error: PartialBatchError
+
+        Returns:
+            None
+        """
+        if call is not None and not call.marker:
+            call.args = (args[0][: error.processed], *call.args[1:])
+
+    def _iter_sync(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Iterator[Any]:
+        """
+        Iterate over a generator function, recording every 'self._items_per_call' consumed items as one
+        FunctionCall.  The call is recorded when the first item of the batch is handed out, and later items
+        are added to it, so a rollback only covers items that were actually consumed.
+
+        The recorded args are '(items, *args)', so the rollback function receives the list of items first.
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Iterator over the yielded items
+        """
+        batch: list[Any] | None = None
+        for item in self._invoke(instance, args, kwargs):
+            if batch is None or len(batch) >= self._items_per_call:
+                batch = [item]
+                self._record(instance, (batch, *args), kwargs)
+            else:
+                batch.append(item)
+            yield item
+
+    async def _iter_async(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Async version of '_iter_sync' for async generator functions
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            AsyncIterator over the yielded items
+        """
+        batch: list[Any] | None = None
+        async for item in self._invoke(instance, args, kwargs):
+            if batch is None or len(batch) >= self._items_per_call:
+                batch = [item]
+                self._record(instance, (batch, *args), kwargs)
+            else:
+                batch.append(item)
+            yield item
+
+    def _record(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> FunctionCall | None:
+        """
+        Record the call on the current TransactionState, if there is one.
+        Bound method calls hold a weak reference to the instance, or its 'instance_key'.
+        Calls without a rollback function follow the RecordPolicy of the wrapper or the state, unless there is
+        a commit or prepare function: those calls are only queued for commit, as there is nothing to roll back.
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            FunctionCall | None
+                Recorded or queued call, None if nothing was recorded
+        """
+        state = TransactionState.get_current()
+        if not state:
+            return None
+
+        has_commit = self.commit_func is not None or self.prepare_func is not None
+        if self.rollback_func is None and not has_commit:
+            policy = self._record_policy or state.record_policy
+            if policy is not RecordPolicy.ALL:
+                if policy is RecordPolicy.SKIP or (policy is RecordPolicy.SAMPLE and not state._sample()):
+                    return None
+                marker = FunctionCall(name=self.func.__qualname__, args=(), kwargs={}, marker=True)
+                state.record_call(marker)
+                return marker
+
         call = FunctionCall(
             name=self.func.__qualname__,
             args=args,
             kwargs=kwargs,
             rollback_func=self.rollback_func,
+            partition=self._partition_key(instance, args, kwargs),
+            idempotency_key=self._key(self._idempotency_key, instance, args, kwargs),
         )
+        if instance is not None:
+            if self._instance_key is not None:
+                call.instance_key = self._instance_key(instance)
+            else:
+                try:
+                    call.instance_ref = weakref.ref(instance)
+                except TypeError:
+                    raise TypeError(
+                        f"Cannot create a weak reference to {type(instance).__name__!r} instance, "
+                        f"pass 'instance_key' to @transaction for {self.func.__qualname__}"
+                    ) from None
+        if has_commit:
+            state.queue_commit(self.prepare_func, self.commit_func, call)
+            if self.rollback_func is None:
+                return call
+        state.record_call(call)
+        return call
+
+    def _partition_key(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable | None:
+        """
+        Partition key of a call, from the 'partition' function or the current 'TransactionState.partition()' scope
 
-        state = TransactionState.get_current()
-        if state:
-            state.record_call(call)
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Hashable | None
+        """
+        if self._partition is None:
+            return TransactionState._current_partition.get()
+        return self._key(self._partition, instance, args, kwargs)
+
+    @staticmethod
+    def _key(
+        key_func: Callable[..., Hashable] | None, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Hashable | None:
+        """
+        Call a key function with the arguments of a call
+
+        Args:
+            key_func: Callable | None
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Hashable | None
+                None without a key function
+        """
+        if key_func is None:
+            return None
+        if instance is not None:
+            return key_func(instance, *args, **kwargs)
+        return key_func(*args, **kwargs)
+
+    def _invoke(self, instance: Any, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+        """
+        Call the wrapped function
+
+        Args:
+            instance: Instance of a bound method call, None otherwise
+            args: Arguments
+            kwargs: KeyWord Arguments
+
+        Returns:
+            Result of the wrapped function
+        """
+        if instance is not None:
+            return self.func(instance, *args, **kwargs)
 
         # As we do not have access to the developers' code, we do not know paramspec or kwargspec.
-        func_type = inspect_function(self.func)
+        func_type = self._func_type
+        if func_type is None:
+            func_type = self._func_type = inspect_function(self.func)
 
         if func_type == FunctionType.CLASS_METHOD:
             class_type = get_class(self.func)
-            result = self.func(class_type, *args, **kwargs)  # type: ignore[arg-type]
-        else:
-            result = self.func(*args, **kwargs)  # type: ignore[arg-type]
+            return self.func(class_type, *args, **kwargs)
+        return self.func(*args, **kwargs)
+
+
+class BoundTransactionMethod:
+    """
+    Class representation of a TransactionWrapper bound to an instance, returned by 'TransactionWrapper.__get__'
+    """
 
-        if self._is_coroutine and inspect.isawaitable(result):
+    def __init__(self, wrapper: TransactionWrapper, instance: Any) -> None:
+        self.__func__ = wrapper
+        self.__self__ = instance
+        self.__name__ = wrapper.func.__name__
+        self.__qualname__ = wrapper.func.__qualname__
+        self.__doc__ = wrapper.func.__doc__
 
-            async def wrapped() -> T:
-                return await result  # type: ignore[no-any-return]
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Record and call the wrapped method with 'self.__self__' as the instance
 
-            return wrapped()
+        Args:
+            *args: Arguments
+            **kwargs: KeyWord Arguments
+
+        Returns:
+            Callable or Awaitable function
+        """
+        return self.__func__._call(self.__self__, args, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Forward attribute access, such as 'rollback', to the TransactionWrapper like a bound method does
+
+        Args:
+            name: Attribute name
+
+        Returns:
+            Attribute of the TransactionWrapper
+        """
+        return getattr(self.__func__, name)
 
-        return result  # type: ignore[return-value]
+    def __repr__(self) -> str:
+        return f"<bound transaction method {self.__qualname__} of {self.__self__!r}>"
@@ -0,0 +1,188 @@
+import itertools
+import reprlib
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import TextIO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from transaction.classes.transaction_state import TransactionState
+
+
+@dataclass
+class TransactionSummary:
+    """
+    Class to represent a compact summary of a finished transaction, kept by the FlightRecorder
+    """
+
+    finished_at: float
+    duration: float
+    outcome: str
+    error: str | None = None
+    calls: int = 0
+    rolled_back: int = 0
+    rollback_failed: int = 0
+    rollback_duration: float = 0.0
+    # (name, args preview, rolled_back, exception) of the last calls
+    recent_calls: list[tuple[str, str, bool, str | None]] = field(default_factory=list)
+
+
+class FlightRecorder:
+    """
+    Class to keep summaries of the most recent transactions in a fixed size ring buffer, for debugging.
+
+    Every entered TransactionState is summarized when it is exited, successful or not.  Summaries hold at most
+    'max_calls' calls with args previews of at most 'preview_length' characters, so memory stays constant.
+    """
+
+    def __init__(self, size: int = 100, max_calls: int = 20, preview_length: int = 80) -> None:
+        """
+        Initialize FlightRecorder
+
+        Args:
+            size: int
+                Number of transactions kept
+            max_calls: int
+                Number of calls kept per transaction, the last ones
+            preview_length: int
+                Maximum length of the args preview of a call
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.max_calls = max_calls
+        self.preview_length = preview_length
+        self._slots: list[TransactionSummary | None] = [None] * size
+        self._counter = itertools.count()
+        self._last = -1
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = self._repr.maxother = preview_length
+
+    @classmethod
+    def install(cls, size: int = 100, max_calls: int = 20, preview_length: int = 80) -> "FlightRecorder":
+        """
+        Create a FlightRecorder and make every TransactionState report to it from now on
+
+        Returns:
+            FlightRecorder
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        recorder = cls(size=size, max_calls=max_calls, preview_length=preview_length)
+        TransactionState.flight_recorder = recorder
+        return recorder
+
+    @staticmethod
+    def uninstall() -> None:
+        """
+        Stop recording transactions
+
+        Returns:
+            None
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        TransactionState.flight_recorder = None
+
+    def record(self, state: "TransactionState", error: BaseException | None = None) -> None:
+        """
+        Store a summary of 'state', replacing the oldest one when the buffer is full
+
+        Args:
+            state: TransactionState
+            error: BaseException | None
+                Exception the transaction exited with, or the exception of a vetoed or failed commit
+
+        Returns:
+            None
+        """
+        stats = state.stats
+        if error is None:
+            outcome = "committed"
+        elif state._root._commit_failed:
+            outcome = "commit_failed"
+        elif stats.rollback_failed:
+            outcome = "rollback_failed"
+        else:
+            outcome = "rolled_back"
+        recent = state.recent_calls(self.max_calls) if self.max_calls else []
+        summary = TransactionSummary(
+            finished_at=time.time(),
+            duration=stats.elapsed,
+            outcome=outcome,
+            error=self._preview(error) if error is not None else None,
+            calls=stats.calls,
+            rolled_back=stats.rolled_back,
+            rollback_failed=stats.rollback_failed,
+            rollback_duration=stats.rollback_duration,
+            recent_calls=[
+                (call.name, self._preview(call.args, call.kwargs), call.rolled_back, call.exception) for call in recent
+            ],
+        )
+        index = next(self._counter)
+        self._slots[index % self.size] = summary
+        self._last = index
+
+    def _preview(self, *values: Any) -> str:
+        preview = ", ".join(self._repr.repr(value) for value in values)
+        if len(preview) > self.preview_length:
+            preview = preview[: self.preview_length - 3] + "..."
+        return preview
+
+    def summaries(self) -> list[TransactionSummary]:
+        """
+        Kept summaries, oldest first
+
+        Returns:
+            list[TransactionSummary]
+        """
+        start = (self._last + 1) % self.size
+        return [slot for slot in self._slots[start:] + self._slots[:start] if slot is not None]
+
+    def dump(self, file: TextIO | None = None) -> str:
+        """
+        Kept summaries as JSON, oldest first
+
+        Args:
+            file: TextIO | None
+                Also write the JSON, and a newline, to this file
+
+        Returns:
+            str
+        """
+        import json
+
+        data = json.dumps([asdict(summary) for summary in self.summaries()])
+        if file is not None:
+            file.write(data + "\n")
+            file.flush()
+        return data
+
+    def dump_on_signal(self, signum: int | None = None, path: str | None = None) -> None:
+        """
+        Dump the summaries when the process receives 'signum', such as 'kill -USR1 <pid>'.
+        Must be called from the main thread.
+
+        Args:
+            signum: int | None
+                Signal number, defaults to SIGUSR1
+            path: str | None
+                File the JSON is appended to, defaults to stderr
+
+        Returns:
+            None
+        """
+        import signal
+        import sys
+
+        def handler(received: int, frame: Any) -> None:
+            if path is None:
+                self.dump(sys.stderr)
+                return
+            with open(path, "a") as f:
+                self.dump(f)
+
+        signal.signal(signum if signum is not None else signal.SIGUSR1, handler)
@@ -1,6 +1,7 @@
 import functools
 import inspect
 import types
+import weakref
 from collections.abc import Callable
 from enum import auto
 from enum import Enum
@@ -16,25 +17,47 @@ class FunctionType(Enum):
     BUILTIN_FUNCTION = auto()
     ASYNC_FUNCTION = auto()
     GENERATOR_FUNCTION = auto()
+    ASYNC_GENERATOR_FUNCTION = auto()
     COROUTINE_FUNCTION = auto()
     PARTIAL_FUNCTION = auto()
     UNKNOWN = auto()
 
     def is_callable(self) -> bool:
-        return self in {
-            FunctionType.ASYNC_FUNCTION,
-            FunctionType.COROUTINE_FUNCTION,
-            FunctionType.INSTANCE_METHOD,
-            FunctionType.REGULAR_FUNCTION,
-        }
+        return self in _CALLABLE_TYPES
 
     def is_not_supported(self) -> bool:
-        return self not in {
-            FunctionType.LAMBDA_FUNCTION,
-            FunctionType.PARTIAL_FUNCTION,
-            FunctionType.GENERATOR_FUNCTION,
-            FunctionType.BUILTIN_FUNCTION,
-        }
+        return self not in _UNSUPPORTED_TYPES
+
+
+# Built once instead of on every call
+_CALLABLE_TYPES = frozenset(
+    {
+        FunctionType.ASYNC_FUNCTION,
+        FunctionType.COROUTINE_FUNCTION,
+        FunctionType.GENERATOR_FUNCTION,
+        FunctionType.ASYNC_GENERATOR_FUNCTION,
+        FunctionType.INSTANCE_METHOD,
+        FunctionType.REGULAR_FUNCTION,
+    }
+)
+_UNSUPPORTED_TYPES = frozenset(
+    {
+        FunctionType.LAMBDA_FUNCTION,
+        FunctionType.PARTIAL_FUNCTION,
+        FunctionType.BUILTIN_FUNCTION,
+    }
+)
+
+
+class RecordPolicy(Enum):
+    """
+    How calls to functions without a rollback function are recorded
+    """
+
+    ALL = "all"  # Record every call
+    SKIP = "skip"  # Do not record calls without a rollback function
+    MARKER = "marker"  # Record calls without a rollback function as markers, without args or kwargs
+    SAMPLE = "sample"  # Record one of every 'sample_every' calls without a rollback function as a marker
 
 
 def get_function_type(ctx: Any, func: Callable) -> FunctionType:  # type: ignore[type-arg]
@@ -53,6 +76,10 @@ def get_function_type(ctx: Any, func: Callable) -> FunctionType:  # type: ignore
     if inspect.isgeneratorfunction(func):
         return FunctionType.GENERATOR_FUNCTION
 
+    code = getattr(func, "__code__", None)
+    if code is not None and code.co_flags & inspect.CO_ASYNC_GENERATOR:
+        return FunctionType.ASYNC_GENERATOR_FUNCTION
+
     if inspect.ismethod(func):
         if func.__self__ is not None and isinstance(func.__self__, type):
             return FunctionType.CLASS_METHOD
@@ -78,13 +105,38 @@ def get_function_type(ctx: Any, func: Callable) -> FunctionType:  # type: ignore
     return FunctionType.UNKNOWN
 
 
+_function_types: "weakref.WeakKeyDictionary[Callable[..., Any], FunctionType]" = weakref.WeakKeyDictionary()
+
+
 def inspect_function(func: Callable) -> FunctionType:  # type: ignore[type-arg]
     """
     Automatically determines the context and returns FunctionType.
+    Results are cached per function, holding only a weak reference to it.  Callables that are not hashable
+    or can not be weakly referenced are classified every time.
     """
+    try:
+        return _function_types[func]
+    except KeyError:
+        pass
+    except TypeError:
+        return _classify(func)
+
+    func_type = _classify(func)
+    _function_types[func] = func_type
+    return func_type
+
+
+def _classify(func: Callable) -> FunctionType:  # type: ignore[type-arg]
     ctx = getattr(func, "__self__", None) or func
     return get_function_type(ctx, func)
 
 
-def get_class(func: Callable) -> Any:  # type:ignore[type-arg]
+def clear_function_type_cache() -> None:
+    """
+    Clear the cache used by 'inspect_function'.
+    """
+    _function_types.clear()
+
+
+def get_class(func: Callable) -> Any:  # type: ignore[type-arg]
     return getattr(func, "__class__", func)
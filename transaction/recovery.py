@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Executor
+from typing import Any
+from typing import TypeVar
+
+from transaction.classes.function_call import FunctionCall
+from transaction.classes.recovery_report import RecoveryOutcome
+from transaction.classes.recovery_report import RecoveryReport
+from transaction.classes.transaction_state import TransactionState
+
+T = TypeVar("T")
+
+
+def recover_histories(
+    histories: Iterable[str | bytes],
+    processes: int | None = None,
+    concurrency: int = 100,
+    batch_size: int = 1000,
+    executor: Executor | None = None,
+    on_outcome: Callable[[RecoveryOutcome], None] | None = None,
+) -> RecoveryReport:
+    """
+    Roll back many exported TransactionState histories.
+
+    Histories are decoded to TransactionStates in batches in a process pool, while the rollbacks of already decoded
+    histories run concurrently on one event loop.  The next batch is only decoded once at most one batch of states
+    waits for a rollback slot, so memory stays bounded for any number of histories.  Calls already marked as rolled
+    back are skipped.
+
+    Args:
+        histories: Iterable[str | bytes]
+            Histories created by 'TransactionState.export_history' (str) or 'export_compressed' (bytes)
+        processes: int | None
+            Number of decoding processes.  None uses the number of CPUs, 0 decodes in this process.
+        concurrency: int
+            Maximum number of histories rolled back at the same time
+        batch_size: int
+            Number of histories sent to the process pool at a time
+        executor: Executor | None
+            Executor used for decoding instead of a new process pool, such as a pool shared by several calls.
+            'processes' is then ignored.
+        on_outcome: Callable | None
+            Called with every RecoveryOutcome as soon as the history is handled, such as to checkpoint progress
+
+    Returns:
+        RecoveryReport
+            One RecoveryOutcome per history, in input order
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    start = time.perf_counter()
+    if executor is not None:
+        outcomes = asyncio.run(_recover(histories, executor, concurrency, batch_size, on_outcome))
+    elif processes == 0:
+        outcomes = asyncio.run(_recover(histories, None, concurrency, batch_size, on_outcome))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            outcomes = asyncio.run(_recover(histories, pool, concurrency, batch_size, on_outcome))
+    return RecoveryReport(outcomes=outcomes, duration=time.perf_counter() - start)
+
+
+def rollback_states(states: Iterable[TransactionState], concurrency: int = 100) -> RecoveryReport:
+    """
+    Roll back many TransactionStates, live or imported, on a single event loop.
+
+    Every state keeps its own rollback order, while the rollbacks of different states run concurrently.
+    'concurrency' limits the number of calls rolled back at the same time, over all states and their branches.
+    Calls already marked as rolled back are skipped.  Every call is rolled back with its own rollback function,
+    calls of different states are not merged into batches.  Use 'rollback_states_async' inside a running event
+    loop.
+
+    Args:
+        states: Iterable[TransactionState]
+        concurrency: int
+            Maximum number of calls rolled back at the same time
+
+    Returns:
+        RecoveryReport
+            One RecoveryOutcome per state, in input order
+    """
+    return asyncio.run(rollback_states_async(states, concurrency=concurrency))
+
+
+async def rollback_states_async(states: Iterable[TransactionState], concurrency: int = 100) -> RecoveryReport:
+    """
+    Async version of 'rollback_states'
+
+    Args:
+        states: Iterable[TransactionState]
+        concurrency: int
+            Maximum number of calls rolled back at the same time
+
+    Returns:
+        RecoveryReport
+            One RecoveryOutcome per state, in input order
+    """
+    start = time.perf_counter()
+    # The tasks created by 'gather' copy the context, and with it the limit
+    token = TransactionState._rollback_limit.set(asyncio.Semaphore(concurrency))
+    try:
+        outcomes = await asyncio.gather(*(_rollback(index, state, None) for index, state in enumerate(states)))
+    finally:
+        TransactionState._rollback_limit.reset(token)
+    return RecoveryReport(outcomes=list(outcomes), duration=time.perf_counter() - start)
+
+
+async def _recover(
+    histories: Iterable[str | bytes],
+    executor: Executor | None,
+    concurrency: int,
+    batch_size: int,
+    on_outcome: Callable[[RecoveryOutcome], None] | None = None,
+) -> list[RecoveryOutcome]:
+    """
+    Decode 'histories' batch by batch and schedule their rollbacks
+
+    Args:
+        histories: Iterable[str | bytes]
+        executor: Executor | None
+            Executor used for decoding, None decodes in the event loop thread
+        concurrency: int
+        batch_size: int
+        on_outcome: Callable | None
+
+    Returns:
+        list[RecoveryOutcome]
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: list[asyncio.Task[RecoveryOutcome]] = []
+    pending: set[asyncio.Task[RecoveryOutcome]] = set()
+
+    for batch in _batched(histories, batch_size):
+        # Rollbacks keep running while waiting, and while the next batch is decoded
+        while len(pending) > concurrency + batch_size:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if executor is None:
+            decoded = _decode_batch(batch)
+        else:
+            try:
+                decoded = await loop.run_in_executor(executor, _decode_batch, batch)
+            except Exception:  # noqa: BLE001
+                # Such as a rollback function that can not be pickled by reference
+                decoded = _decode_batch(batch)
+        for state, error in decoded:
+            index = len(tasks)
+            task = asyncio.create_task(_handle(index, state, error, semaphore, on_outcome))
+            tasks.append(task)
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    return list(await asyncio.gather(*tasks))
+
+
+async def _rollback(index: int, state: TransactionState, semaphore: asyncio.Semaphore | None) -> RecoveryOutcome:
+    """
+    Roll back 'state' once a slot of 'semaphore' is free
+
+    Args:
+        index: int
+            Position of the history, or state, in the input
+        state: TransactionState
+        semaphore: asyncio.Semaphore | None
+            Limit on the number of states rolled back at the same time, None for no limit
+
+    Returns:
+        RecoveryOutcome
+    """
+    async with semaphore if semaphore is not None else contextlib.nullcontext():
+        start = time.perf_counter()
+        error = None
+        try:
+            await state.rollback_async()
+        except Exception as e:  # noqa: BLE001
+            error = f"{type(e).__name__}: {e}"
+        calls = list(state.iter_calls())
+        return RecoveryOutcome(
+            index=index,
+            success=error is None,
+            calls=len(calls),
+            rolled_back=sum(1 for call in calls if call.rolled_back),
+            rolled_back_seqs=[call.seq for call in calls if call.rolled_back and call.seq is not None],
+            error=error,
+            duration=time.perf_counter() - start,
+        )
+
+
+async def _handle(
+    index: int,
+    state: TransactionState | None,
+    error: str | None,
+    semaphore: asyncio.Semaphore,
+    on_outcome: Callable[[RecoveryOutcome], None] | None,
+) -> RecoveryOutcome:
+    """
+    Roll back a decoded history, and report its outcome to 'on_outcome'
+
+    Args:
+        index: int
+            Position of the history in the input
+        state: TransactionState | None
+            Decoded history, None if it could not be decoded
+        error: str | None
+            Decoding error
+        semaphore: asyncio.Semaphore
+        on_outcome: Callable | None
+
+    Returns:
+        RecoveryOutcome
+    """
+    if state is None:
+        outcome = RecoveryOutcome(index=index, success=False, error=error)
+    else:
+        outcome = await _rollback(index, state, semaphore)
+    if on_outcome is not None:
+        on_outcome(outcome)
+    return outcome
+
+
+def _decode_batch(batch: list[str | bytes]) -> list[tuple[TransactionState | None, str | None]]:
+    """
+    Decode a batch of histories to TransactionStates.  Runs in a worker process, so the event loop only unpickles
+    the states.
+
+    Args:
+        batch: list[str | bytes]
+
+    Returns:
+        list of (state, error) tuples
+    """
+    import json
+
+    from transaction.classes.compressed_history import CompressedHistory
+
+    resolve = _cached_resolver()
+    decoded: list[tuple[TransactionState | None, str | None]] = []
+    for history in batch:
+        try:
+            state = TransactionState()
+            if isinstance(history, bytes):
+                for call in CompressedHistory.decode(history):
+                    state.record_call(call)
+            else:
+                for item in json.loads(history):
+                    state.record_call(FunctionCall.from_dict(item, resolve=resolve))
+            decoded.append((state, None))
+        except Exception as e:  # noqa: BLE001
+            decoded.append((None, f"{type(e).__name__}: {e}"))
+    return decoded
+
+
+def _batched(items: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+    batch: list[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _cached_resolver() -> Callable[[str], Callable[..., Any]]:
+    """
+    Returns a version of 'FunctionCall._resolve_function' that resolves every name only once
+
+    Returns:
+        Callable
+    """
+    resolved: dict[str, Callable[..., Any]] = {}
+
+    def resolve(qualified_name: str) -> Callable[..., Any]:
+        if qualified_name not in resolved:
+            resolved[qualified_name] = FunctionCall._resolve_function(qualified_name)
+        return resolved[qualified_name]
+
+    return resolve
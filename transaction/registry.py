@@ -0,0 +1,131 @@
+import threading
+import time
+import weakref
+from typing import Any
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import socketserver
+
+    from transaction.classes.transaction_state import TransactionState
+
+
+class TransactionRegistry:
+    """
+    Class to keep track of the TransactionStates that are active in this process.
+
+    States join when they are entered and leave when they are exited.  The registry only holds weak references,
+    so it does not keep states alive.
+    """
+
+    def __init__(self) -> None:
+        self._states: weakref.WeakSet[TransactionState] = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def install(cls) -> "TransactionRegistry":
+        """
+        Create a registry and make every TransactionState join it from now on
+
+        Returns:
+            TransactionRegistry
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        registry = cls()
+        TransactionState.registry = registry
+        return registry
+
+    @staticmethod
+    def uninstall() -> None:
+        """
+        Stop registering TransactionStates
+
+        Returns:
+            None
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        TransactionState.registry = None
+
+    def register(self, state: "TransactionState") -> None:
+        with self._lock:
+            self._states.add(state)
+
+    def unregister(self, state: "TransactionState") -> None:
+        with self._lock:
+            self._states.discard(state)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def states(self) -> list["TransactionState"]:
+        """
+        Active states, oldest first
+
+        Returns:
+            list[TransactionState]
+        """
+        with self._lock:
+            states = list(self._states)
+        return sorted(states, key=lambda state: state.stats.started_at or 0.0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Summary of the active states, oldest first.  Only reads counters kept by the states, no stack is walked.
+
+        Returns:
+            dict[str, Any]
+                'time', 'count', and per state 'id', 'age' in seconds, 'depth' of its own stack, number of
+                'branches' and its 'stats'
+        """
+        transactions = [
+            {
+                "id": id(state),
+                "age": state.stats.elapsed,
+                "depth": len(state.stack),
+                "branches": len(state.branches),
+                "stats": state.stats.to_dict(),
+            }
+            for state in self.states()
+        ]
+        return {"time": time.time(), "count": len(transactions), "transactions": transactions}
+
+    def serve(self, address: str | tuple[str, int]) -> "socketserver.BaseServer":
+        """
+        Serve 'snapshot()' as JSON over HTTP from a daemon thread.  Call 'shutdown()' on the returned server to
+        stop it.
+
+        Args:
+            address: str | tuple[str, int]
+                Path of a Unix socket, or (host, port) of a TCP socket, such as ("127.0.0.1", 0)
+
+        Returns:
+            socketserver.BaseServer
+        """
+        import json
+        import socketserver
+        from http.server import BaseHTTPRequestHandler
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                body = json.dumps(registry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        server: socketserver.BaseServer
+        if isinstance(address, str):
+            server = socketserver.ThreadingUnixStreamServer(address, Handler)
+        else:
+            server = socketserver.ThreadingTCPServer(address, Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="transaction-registry", daemon=True).start()
+        return server
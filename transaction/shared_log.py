@@ -0,0 +1,424 @@
+import atexit
+import itertools
+import json
+import os
+import struct
+import sys
+import threading
+from collections.abc import Iterator
+from multiprocessing import shared_memory
+from typing import Any
+from typing import TYPE_CHECKING
+
+from transaction.classes.function_call import FunctionCall
+
+if TYPE_CHECKING:
+    from transaction.classes.recovery_report import RecoveryReport
+    from transaction.classes.transaction_state import TransactionState
+
+MAGIC = b"TXNL"
+# Magic, pid of the writing process, and the offsets of the first record and after the last complete record
+HEADER = struct.Struct("<4sIQQ")
+# Kind, transaction id, call seq, and payload length, followed by the payload
+RECORD = struct.Struct("<BQqI")
+CALL = 1
+ROLLED_BACK = 2
+END = 3
+
+
+def segment_name(pid: int, prefix: str = "transaction") -> str:
+    """
+    Default name of the segment of the worker process 'pid'
+
+    Args:
+        pid: int
+        prefix: str
+
+    Returns:
+        str
+    """
+    return f"{prefix}-{pid}"
+
+
+class SharedMemoryLog:
+    """
+    Class to log the calls of unfinished transactions of a worker process in a shared memory segment, so a
+    supervisor can roll them back when the worker dies.
+
+    The worker appends a record for every call recorded on an entered TransactionState and every rolled back
+    call, and one when the state is exited.  Records are written to memory only, and a record becomes visible once
+    the header points past it, so a crash never leaves a partial record.  Once every logged transaction has been
+    exited the segment starts over from the beginning.  Before the space after the last record gets too small to
+    hold a copy of the records of open transactions, they are copied next to the current records, without the
+    records of exited transactions and rolled back calls, and the header is switched to the copy.  When a record
+    does not fit even then, recording the call raises BufferError before the call is made, so 'size' must hold
+    twice the calls of all transactions open at the same time.
+
+    Call args are stored as JSON, like 'TransactionState.export_history()', with the repr of values JSON can not
+    represent.  Segments outlive a crashed worker on POSIX systems only.
+    """
+
+    def __init__(self, segment: shared_memory.SharedMemory, owner: bool) -> None:
+        """
+        Initialize SharedMemoryLog, use 'create', 'install' or 'attach' instead
+
+        Args:
+            segment: shared_memory.SharedMemory
+            owner: bool
+                Whether this process writes the log
+        """
+        if segment.buf is None:
+            raise ValueError(f"Shared memory segment {segment.name} is closed")
+        self._segment = segment
+        self._buffer: memoryview = segment.buf
+        self.owner = owner
+        self.pid = os.getpid()
+        self._start = self._end = HEADER.size
+        # Size of the logged records of every open transaction
+        self._open: dict[int, int] = {}
+        # Transaction ids are never reused, so records of an exited transaction are never taken for another's
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        return self._segment.name
+
+    @classmethod
+    def create(cls, name: str | None = None, size: int = 1 << 20) -> "SharedMemoryLog":
+        """
+        Create the segment of this process
+
+        Args:
+            name: str | None
+                Name of the segment, defaults to 'segment_name(os.getpid())'
+            size: int
+                Size of the segment in bytes
+
+        Returns:
+            SharedMemoryLog
+        """
+        segment = _open_segment(name or segment_name(os.getpid()), create=True, size=size)
+        log = cls(segment, owner=True)
+        log._set_records(HEADER.size, HEADER.size)
+        return log
+
+    @classmethod
+    def install(cls, name: str | None = None, size: int = 1 << 20) -> "SharedMemoryLog":
+        """
+        Create the segment of this process and make every TransactionState log to it from now on.
+        The log is closed when the process exits normally.
+
+        Args:
+            name: str | None
+                Name of the segment, defaults to 'segment_name(os.getpid())'
+            size: int
+                Size of the segment in bytes
+
+        Returns:
+            SharedMemoryLog
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        log = cls.create(name=name, size=size)
+        TransactionState.shared_log = log
+        atexit.register(log.close)
+        return log
+
+    @staticmethod
+    def uninstall() -> None:
+        """
+        Stop logging, and close the installed log
+
+        Returns:
+            None
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        log = TransactionState.shared_log
+        TransactionState.shared_log = None
+        if log is not None:
+            log.close()
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedMemoryLog":
+        """
+        Open the segment of another, usually dead, process for reading
+
+        Args:
+            name: str
+                Name of the segment, such as 'segment_name(worker_pid)'
+
+        Returns:
+            SharedMemoryLog
+        """
+        log = cls(_open_segment(name, create=False), owner=False)
+        magic, log.pid, log._start, log._end = HEADER.unpack_from(log._buffer, 0)
+        if magic != MAGIC:
+            log.close()
+            raise ValueError(f"{name} is not a transaction log")
+        return log
+
+    def record(self, state: "TransactionState", call: FunctionCall) -> None:
+        """
+        Log a call recorded on 'state', when 'state' has been entered
+
+        Args:
+            state: TransactionState
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        if state._root._token is None:
+            # Imported or rebuilt states are not rolled back by this process, so their calls are not pending
+            return
+        payload = json.dumps(call.to_dict(), separators=(",", ":"), default=repr).encode()
+        root = state._root
+        with self._lock:
+            if root._log_id is None:
+                root._log_id = next(self._ids)
+            self._write(CALL, root._log_id, call.seq, payload)
+
+    def rolled_back(self, state: "TransactionState", call: FunctionCall) -> None:
+        """
+        Log that a call of 'state' was rolled back
+
+        Args:
+            state: TransactionState
+            call: FunctionCall
+
+        Returns:
+            None
+        """
+        transaction_id = state._root._log_id
+        with self._lock:
+            if transaction_id is not None and transaction_id in self._open:
+                self._write(ROLLED_BACK, transaction_id, call.seq, b"")
+
+    def end(self, state: "TransactionState") -> None:
+        """
+        Log that 'state' was exited, so its calls are no longer pending
+
+        Args:
+            state: TransactionState
+
+        Returns:
+            None
+        """
+        root = state._root
+        with self._lock:
+            # A state entered again logs its calls as a new transaction
+            transaction_id, root._log_id = root._log_id, None
+            if transaction_id is None or transaction_id not in self._open:
+                return
+            del self._open[transaction_id]
+            if self._open:
+                self._write(END, transaction_id, -1, b"")
+            else:
+                # Nothing is pending, start over
+                self._set_records(HEADER.size, HEADER.size)
+
+    def _write(self, kind: int, transaction_id: int, seq: int | None, payload: bytes) -> None:
+        size = RECORD.size + len(payload)
+        live = 0 if kind == END else size
+        # A copy of the records of open transactions must always fit after the last record, see '_compact'.  A copy
+        # placed after the records frees the space before them, so a second copy moves them to the beginning.
+        compactions = 0
+        while self._end + size + self._live_size() + live > len(self._buffer):
+            if compactions == 2:
+                raise BufferError(f"Shared memory log {self.name} is full")
+            self._compact()
+            compactions += 1
+        start = self._end
+        end = start + size
+        RECORD.pack_into(self._buffer, start, kind, transaction_id, -1 if seq is None else seq, len(payload))
+        self._buffer[start + RECORD.size : end] = payload
+        self._set_records(self._start, end)
+        if kind != END:
+            self._open[transaction_id] = self._open.get(transaction_id, 0) + size
+
+    def _live_size(self) -> int:
+        return sum(self._open.values())
+
+    def _compact(self) -> None:
+        """
+        Copy the records of open transactions, leaving out exited transactions and rolled back calls, to the free
+        space before the records when they fit there, and after them otherwise.  The current records stay intact
+        until the header points to the copy, so a crash never loses them.
+
+        Returns:
+            None
+        """
+        records = list(self._records(self._start, self._end))
+        # Records of a transaction before its END belong to an exited transaction
+        ended = {transaction_id: start for kind, transaction_id, _, start, _ in records if kind == END}
+        rolled_back = {
+            (transaction_id, seq)
+            for kind, transaction_id, seq, start, _ in records
+            if kind == ROLLED_BACK and start > ended.get(transaction_id, -1)
+        }
+        live = bytearray()
+        self._open = dict.fromkeys(self._open, 0)
+        for kind, transaction_id, seq, start, end in records:
+            if (
+                kind == CALL
+                and transaction_id in self._open
+                and start > ended.get(transaction_id, -1)
+                and (transaction_id, seq) not in rolled_back
+            ):
+                live += self._buffer[start:end]
+                self._open[transaction_id] += end - start
+        target = HEADER.size if HEADER.size + len(live) <= self._start else self._end
+        self._buffer[target : target + len(live)] = live
+        self._set_records(target, target + len(live))
+
+    def _set_records(self, start: int, end: int) -> None:
+        self._start = start
+        self._end = end
+        HEADER.pack_into(self._buffer, 0, MAGIC, self.pid, start, end)
+
+    def _records(self, start: int, end: int) -> Iterator[tuple[int, int, int, int, int]]:
+        """
+        Records between the offsets 'start' and 'end'
+
+        Args:
+            start: int
+            end: int
+
+        Returns:
+            Iterator of (kind, transaction id, call seq, record offset, offset after the record) tuples
+        """
+        offset = start
+        while offset < end:
+            kind, transaction_id, seq, length = RECORD.unpack_from(self._buffer, offset)
+            next_offset = offset + RECORD.size + length
+            yield kind, transaction_id, seq, offset, next_offset
+            offset = next_offset
+
+    def pending(self) -> list[list[dict[str, Any]]]:
+        """
+        Calls of the transactions that were not exited, as 'FunctionCall.to_dict()' dicts in recording order, one
+        list per transaction.  Calls that were rolled back have 'rolled_back' set.
+
+        Returns:
+            list[list[dict[str, Any]]]
+        """
+        _, _, start, end = HEADER.unpack_from(self._buffer, 0)
+        transactions: dict[int, dict[int, dict[str, Any]]] = {}
+        for kind, transaction_id, seq, offset, next_offset in self._records(start, end):
+            if kind == CALL:
+                transactions.setdefault(transaction_id, {})[seq] = json.loads(
+                    bytes(self._buffer[offset + RECORD.size : next_offset])
+                )
+            elif kind == ROLLED_BACK:
+                item = transactions.get(transaction_id, {}).get(seq)
+                if item is not None:
+                    item["rolled_back"] = True
+            elif kind == END:
+                transactions.pop(transaction_id, None)
+        return [list(calls.values()) for calls in transactions.values()]
+
+    def states(self) -> list["TransactionState"]:
+        """
+        Unfinished transactions as TransactionStates, with the calls of branches in recording order
+
+        Returns:
+            list[TransactionState]
+        """
+        from transaction.classes.transaction_state import TransactionState
+
+        states = []
+        for items in self.pending():
+            state = TransactionState()
+            for item in items:
+                state.record_call(FunctionCall.from_dict(item))
+            states.append(state)
+        return states
+
+    def recover(self, concurrency: int = 100) -> "RecoveryReport":
+        """
+        Roll back the unfinished transactions with 'rollback_states'.  Call 'unlink()' once the report shows that
+        every rollback succeeded, so they are not rolled back again.
+
+        Args:
+            concurrency: int
+                Maximum number of transactions rolled back at the same time
+
+        Returns:
+            RecoveryReport
+        """
+        from transaction.recovery import rollback_states
+
+        return rollback_states(self.states(), concurrency=concurrency)
+
+    def close(self) -> None:
+        """
+        Detach from the segment.  The writing process also removes the segment, unless a transaction is still open.
+
+        Returns:
+            None
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        unlink = self.owner and not self._open
+        del self._buffer
+        self._segment.close()
+        if unlink:
+            _unlink_segment(self._segment)
+
+    def unlink(self) -> None:
+        """
+        Detach from and remove the segment
+
+        Returns:
+            None
+        """
+        self.close()
+        try:
+            _unlink_segment(self._segment)
+        except FileNotFoundError:
+            pass
+
+
+def _open_segment(name: str, create: bool, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    Open a shared memory segment that is not removed when this process exits
+
+    Args:
+        name: str
+        create: bool
+        size: int
+
+    Returns:
+        shared_memory.SharedMemory
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    # Older versions unlink every segment opened by the process, crashed or not, when its resource tracker stops
+    from multiprocessing import resource_tracker
+
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]
+    return segment
+
+
+def _unlink_segment(segment: shared_memory.SharedMemory) -> None:
+    """
+    Remove a segment opened with '_open_segment'
+
+    Args:
+        segment: shared_memory.SharedMemory
+
+    Returns:
+        None
+    """
+    if sys.version_info < (3, 13):
+        from multiprocessing import resource_tracker
+
+        # 'unlink' unregisters the segment from the resource tracker
+        resource_tracker.register(segment._name, "shared_memory")  # type: ignore[attr-defined]
+    segment.unlink()